@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+from delivery import histogram_table
+
+# Au-delà de ce nombre de combinaisons possibles, les clés composées sont compactées par np.unique
+MAX_DENSE_GROUPS = 1 << 22
+
+# Plage maximale des colonnes entières codées par simple décalage
+MAX_INT_RANGE = 1 << 16
+
+# Tables du tableau de bord : nom -> (clés de regroupement, mesure, réducteur)
+DASHBOARD_SPECS = {
+    'region_sales': ('Région', 'Ventes', 'sum'),
+    'segment_sales': ('Segment', 'Ventes', 'sum'),
+    'payment_sales': ('Mode Paiement', 'Ventes', 'sum'),
+    'ship_mode_sales': ('Mode Expédition', 'Ventes', 'sum'),
+    'subcat_sales': ('Sous-Catégorie', 'Ventes', 'sum'),
+    'monthly_sales': (('Année', 'Mois'), 'Ventes', 'sum'),
+    'monthly_profit': (('Année', 'Mois'), 'Profit', 'sum'),
+    'total_sales': ((), 'Ventes', 'sum'),
+    'total_profit': ((), 'Profit', 'sum'),
+    'total_quantity': ((), 'Quantité', 'sum'),
+    'delivery_days': ('Mode Expédition', 'Délai Livraison', 'histogram'),
+}
+
+
+# Codes entiers d'une colonne : codes natifs des Categorical, décalage pour les petits
+# entiers (années, mois), factorisation triée sinon
+def column_codes(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories, True
+    if pd.api.types.is_integer_dtype(values.dtype) and len(values):
+        array = values.to_numpy()
+        low, high = int(array.min()), int(array.max())
+        if high - low < MAX_INT_RANGE:
+            uniques = pd.Index(np.arange(low, high + 1, dtype=array.dtype))
+            return (array - low).astype(np.intp), uniques, False
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, uniques, False
+
+
+# Valeurs présentes d'une colonne : ordre des catégories, ordre croissant sinon
+def present_values(values):
+    codes, uniques, _ = column_codes(values)
+    return list(uniques[np.unique(codes[codes >= 0])])
+
+
+# Valeurs des clés à partir de leurs codes (Categorical reconstruit sans copie des catégories)
+def decode_keys(keys, key_codes, uniques):
+    data = {}
+    for key, codes, (values, is_cat) in zip(keys, key_codes, uniques):
+        if is_cat:
+            data[key] = pd.Categorical.from_codes(codes, categories=values)
+        else:
+            data[key] = values.take(codes)
+    return pd.DataFrame(data)
+
+
+# Regroupement calculé une seule fois pour un ensemble de clés, réutilisé par toutes les mesures
+class Grouping:
+    def __init__(self, frame, keys, count_column=None, weights=None):
+        self.frame = frame
+        self.keys = list(keys)
+        self.count_column = count_column
+        self._weight_cache = {} if weights is None else weights
+
+        columns = [column_codes(frame[key]) for key in self.keys]
+        codes = [c for c, _, _ in columns]
+        self._uniques = [(u, is_cat) for _, u, is_cat in columns]
+        sizes = tuple(max(len(u), 1) for u, _ in self._uniques)
+
+        # Les lignes dont une clé est manquante (code -1) sont ignorées, comme dans groupby
+        self._valid = None
+        if any(len(c) and c.min() < 0 for c in codes):
+            self._valid = np.logical_and.reduce([c >= 0 for c in codes])
+            codes = [c[self._valid] for c in codes]
+
+        if not codes:
+            self._sizes = ()
+            self._dense = True
+            self.ids = None
+            self.n_groups = 1
+        elif np.prod(sizes, dtype=np.float64) <= MAX_DENSE_GROUPS:
+            self._sizes = sizes
+            self._dense = True
+            self.ids = np.ravel_multi_index(codes, sizes)
+            self.n_groups = int(np.prod(sizes))
+        else:
+            self._dense = False
+            self._codes = np.stack(codes, axis=1)
+            combined, self.ids = np.unique(self._codes, axis=0, return_inverse=True)
+            self._combined = combined
+            self.ids = self.ids.ravel()
+            self.n_groups = len(combined)
+
+        if self.ids is None:
+            self._rows = np.array([len(frame)])
+        else:
+            self._rows = np.bincount(self.ids, minlength=self.n_groups)
+        self.present = np.flatnonzero(self._rows)
+        self._counts = None
+
+    # Mesures converties en float64 une seule fois, partagées entre regroupements
+    def _weights(self, measure):
+        if measure not in self._weight_cache:
+            self._weight_cache[measure] = self.frame[measure].to_numpy(dtype=np.float64)
+        values = self._weight_cache[measure]
+        return values if self._valid is None else values[self._valid]
+
+    # Valeurs des clés pour chaque groupe non vide, dans l'ordre des clés
+    def key_frame(self):
+        if self._dense:
+            key_codes = np.unravel_index(self.present, self._sizes) if self.keys else ()
+        else:
+            key_codes = self._combined[self.present].T
+        return decode_keys(self.keys, key_codes, self._uniques)
+
+    # Sommes d'une mesure ramenées au type d'origine (les entiers restent entiers)
+    @staticmethod
+    def cast_sums(totals, dtype):
+        if pd.api.types.is_integer_dtype(dtype):
+            return np.rint(totals).astype(np.int64)
+        return totals
+
+    def sum(self, measure):
+        if self.ids is None:
+            totals = np.array([self._weights(measure).sum()])[self.present]
+        else:
+            totals = np.bincount(self.ids, weights=self._weights(measure), minlength=self.n_groups)[self.present]
+        return self.cast_sums(totals, self.frame[measure].dtype)
+
+    def count(self):
+        if self._counts is None:
+            if self.count_column is None:
+                self._counts = self._rows[self.present]
+            else:
+                self._counts = self.sum(self.count_column)
+        return self._counts
+
+    # Histogramme par groupe d'une colonne de petits entiers (0 à bins - 1 ; les valeurs négatives,
+    # inconnues, sont ignorées) : tableau (groupes non vides, bins)
+    def histogram(self, codes, bins, weights=None):
+        if self._valid is not None:
+            codes = codes[self._valid]
+            weights = None if weights is None else weights[self._valid]
+        if self.ids is None:
+            slots = np.zeros(len(codes), dtype=np.intp)
+        else:
+            rank = np.zeros(self.n_groups, dtype=np.intp)
+            rank[self.present] = np.arange(len(self.present))
+            slots = rank[self.ids]
+        keep = codes >= 0
+        if not keep.all():
+            slots, codes = slots[keep], codes[keep]
+            weights = None if weights is None else weights[keep]
+        flat = np.bincount(slots * bins + codes, weights=weights, minlength=len(self.present) * bins)
+        return flat.reshape(len(self.present), bins)
+
+    def reduce(self, measure, reducer):
+        if reducer == 'sum':
+            return self.sum(measure)
+        if reducer == 'count':
+            return self.count()
+        if reducer == 'mean':
+            counts = self.count()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return self.sum(measure) / counts
+        raise ValueError(f"Réducteur inconnu : {reducer}")
+
+
+# Normalise les clés d'une spécification en tuple
+def spec_keys(keys):
+    if keys is None:
+        return ()
+    if isinstance(keys, str):
+        return (keys,)
+    return tuple(keys)
+
+
+# Calcule toutes les spécifications demandées en partageant les codes de regroupement
+# Clés vides -> scalaire ; sinon DataFrame (clés..., mesure) comme groupby(...).sum().reset_index()
+# Réducteur 'histogram' : DataFrame (clés..., un nombre de commandes par délai, voir delivery.py)
+def aggregate(frame, specs, count_column=None):
+    groupings = {}
+    weights = {}
+    results = {}
+    for name, (keys, measure, reducer) in specs.items():
+        keys = spec_keys(keys)
+        if keys not in groupings:
+            groupings[keys] = Grouping(frame, keys, count_column, weights)
+        grouping = groupings[keys]
+        if reducer == 'histogram':
+            results[name] = histogram_table(grouping, frame, count_column)
+            continue
+        values = grouping.reduce(measure, reducer)
+        if not keys:
+            results[name] = values[0] if len(values) else (0.0 if reducer != 'mean' else float('nan'))
+            continue
+        table = grouping.key_frame()
+        table[measure] = values
+        results[name] = table
+    return results
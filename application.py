@@ -1,13 +1,29 @@
 
 
+import os
+from contextlib import contextmanager
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-import numpy as np
 from datetime import datetime
 
+from backends import DuckDBBackend, PandasBackend
+from charts import TABLE_CHARTS, TIMELINE_CHARTS, build_ranking_bar, build_timeline_chart, kpi_values
+from dataset import FILTER_COLUMNS
+from delivery import format_days, format_quantile
+from figure_cache import DEFAULT_MAX_ENTRIES, FigureCache
+from ingest import DEFAULT_WATCH_INTERVAL
+from periods import PERIOD_PRESETS, preset_range, to_day
+from profiling import Profiler, profile_mode
+from progressive import ProgressiveLoader
+from ranking import DEFAULT_TOP_K, RANKING_COLUMNS, RANKING_MEASURES
+from sampling import DEFAULT_SAMPLE_ROWS
+from snapshots import DEFAULT_SNAPSHOT_DIR, load_snapshot
+from sources import open_store
+from timeseries import DEFAULT_POINT_BUDGET, GRANULARITIES, downsample
+
 # Configuration de la page
 st.set_page_config(
     page_title="Tableau de Bord des Ventes Super Store",
@@ -16,6 +32,11 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Profilage optionnel de la réexécution (DASHBOARD_PROFILE, ou ?profile=1|cprofile|pyinstrument
+# avec DASHBOARD_PROFILE_QUERY=1)
+profiler = Profiler(profile_mode(st.query_params.get('profile')))
+profiler.start_capture()
+
 # CSS personnalisé pour reproduire exactement le design
 st.markdown("""
 <style>
@@ -78,6 +99,12 @@ st.markdown("""
         line-height: 1;
     }
     
+    .metric-margin {
+        font-size: 0.8rem;
+        color: #ddd;
+        margin-top: 4px;
+    }
+    
     .metric-label {
         font-size: 1.2rem;
         color: #ddd;
@@ -200,68 +227,54 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Fonction pour charger les données depuis le fichier Excel
-@st.cache_data
-def load_real_data():
-    try:
-        df = pd.read_excel('DONNEESS.xlsx')
-        df['Order Date'] = pd.to_datetime(df['Order Date'], errors='coerce')
-        df['Ship Date'] = pd.to_datetime(df['Ship Date'], errors='coerce')
-        df['Year'] = df['Order Date'].dt.year
-        df['Month'] = df['Order Date'].dt.month
-        df['Month-Year'] = df['Order Date'].dt.to_period('M')
-        df = df.dropna(subset=['Order Date', 'Sales', 'Profit'])
-        return df
-    except:
-        return load_data()
-
-# Fonction pour charger les données simulées
-@st.cache_data
-def load_data():
-    np.random.seed(42)
-    dates = pd.date_range(start='2019-01-01', end='2021-12-31', freq='D')
-    n_records = 5901
-    
-    regions = ['Est', 'Ouest', 'Centre', 'Sud']
-    segments = ['Consommateur', 'Entreprise', 'Bureau à domicile']
-    ship_modes = ['Classe Standard', 'Deuxième Classe', 'Première Classe', 'Même Jour']
-    payment_modes = ['Cartes', 'En ligne', 'Contre-remboursement']
-    categories = ['Fournitures de Bureau', 'Mobilier', 'Technologie']
-    sub_categories = ['Classeurs', 'Chaises', 'Téléphones']
-    
-    data = []
-    for i in range(n_records):
-        order_date = pd.Timestamp(np.random.choice(dates))
-        ship_date = order_date + pd.Timedelta(days=np.random.randint(1, 15))
-        
-        record = {
-            'ID Commande': f'FR-{order_date.year}-{100000 + i}',
-            'Date Commande': order_date,
-            'Date Expédition': ship_date,
-            'Mode Expédition': np.random.choice(ship_modes),
-            'Région': np.random.choice(regions),
-            'Segment': np.random.choice(segments),
-            'Catégorie': np.random.choice(categories),
-            'Sous-Catégorie': np.random.choice(sub_categories),
-            'Ventes': np.random.uniform(10, 500),
-            'Quantité': np.random.randint(1, 10),
-            'Profit': np.random.uniform(-50, 200),
-            'Mode Paiement': np.random.choice(payment_modes),
-            'Livraison Moyenne': np.random.randint(1, 14)
-        }
-        data.append(record)
-    
-    df = pd.DataFrame(data)
-    df['Date Commande'] = pd.to_datetime(df['Date Commande'])
-    df['Date Expédition'] = pd.to_datetime(df['Date Expédition'])
-    df['Année'] = df['Date Commande'].dt.year
-    df['Mois'] = df['Date Commande'].dt.month
-    df['Mois-Année'] = df['Date Commande'].dt.to_period('M')
-    
-    return df
-
-# Charger les données
-df = load_data()  # Changez par load_real_data() pour utiliser vos vraies données
+# Jeu de données et cube pré-agrégé, partagés entre les sessions du processus
+# Les lots de nouvelles commandes déposés dans DASHBOARD_DELTA_DIR y sont ajoutés au fil de l'eau ;
+# un fichier source remplacé est rechargé en arrière-plan (DASHBOARD_WATCH_INTERVAL secondes, 0 : jamais)
+@st.cache_resource
+def load_store(source):
+    return open_store(source, os.environ.get('DASHBOARD_DELTA_DIR', 'deltas'), WATCH_INTERVAL)
+
+# Chargement progressif : échantillon stratifié tout de suite, jeu complet en arrière-plan
+@st.cache_resource
+def load_progressive(source):
+    return ProgressiveLoader(source, os.environ.get('DASHBOARD_DELTA_DIR', 'deltas'),
+                             int(os.environ.get('DASHBOARD_SAMPLE_ROWS', DEFAULT_SAMPLE_ROWS)),
+                             watch_interval=WATCH_INTERVAL)
+
+# Cache des figures construites, partagé par toutes les sessions
+@st.cache_resource
+def load_figure_cache():
+    return FigureCache(int(os.environ.get('DASHBOARD_FIGURE_CACHE', DEFAULT_MAX_ENTRIES)))
+
+# Moteur DuckDB sur fichiers Parquet, pour les jeux qui ne tiennent pas en mémoire
+@st.cache_resource
+def load_duckdb_backend(path):
+    return DuckDBBackend(path)
+
+# Charger les données (DASHBOARD_SOURCE=real pour utiliser vos vraies données)
+# DASHBOARD_BACKEND=duckdb interroge directement les fichiers DASHBOARD_PARQUET
+DATA_SOURCE = os.environ.get('DASHBOARD_SOURCE', 'synthetic')
+DATA_BACKEND = os.environ.get('DASHBOARD_BACKEND', 'pandas')
+POINT_BUDGET = int(os.environ.get('DASHBOARD_POINT_BUDGET', DEFAULT_POINT_BUDGET))
+SNAPSHOT_DIR = os.environ.get('DASHBOARD_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR)
+LAZY_SECTIONS = os.environ.get('DASHBOARD_LAZY_SECTIONS', '0') == '1'
+PROGRESSIVE = os.environ.get('DASHBOARD_PROGRESSIVE', '0') == '1'
+TOP_K = int(os.environ.get('DASHBOARD_TOP_K', DEFAULT_TOP_K))
+WATCH_INTERVAL = float(os.environ.get('DASHBOARD_WATCH_INTERVAL', DEFAULT_WATCH_INTERVAL))
+with profiler.section('load', backend=DATA_BACKEND):
+    if DATA_BACKEND == 'duckdb':
+        backend = load_duckdb_backend(os.environ.get('DASHBOARD_PARQUET', 'commandes.parquet'))
+    elif PROGRESSIVE:
+        # Tant que le jeu complet se charge, estimations sur l'échantillon du lancement précédent ;
+        # au tout premier lancement (pas encore d'échantillon), on attend le jeu complet
+        loader = load_progressive(DATA_SOURCE)
+        backend = None if loader.ready else loader.sample_backend()
+        if backend is None:
+            with st.spinner("Chargement des données..."):
+                backend = PandasBackend(loader.wait().current())
+    else:
+        backend = PandasBackend(load_store(DATA_SOURCE).current())
+    figure_cache = load_figure_cache()
 
 # Titre principal
 st.markdown('<h1 class="title">Tableau de Bord des Ventes Super Store</h1>', unsafe_allow_html=True)
@@ -269,6 +282,19 @@ st.markdown('<h1 class="title">Tableau de Bord des Ventes Super Store</h1>', uns
 # Ligne de séparation
 st.markdown('<div class="section-separator"></div>', unsafe_allow_html=True)
 
+# Valeurs approchées : bandeau d'avertissement, puis réexécution complète dès que le jeu est chargé
+if backend.approximate:
+    sample_rows = f'{len(backend.sample):,}'.replace(',', ' ')
+    st.info(f"Valeurs approchées, estimées sur un échantillon de {sample_rows} commandes "
+            "(intervalles de confiance à 95 %). Les valeurs exactes s'afficheront dès la fin du chargement.")
+
+    @st.fragment(run_every=1)
+    def wait_exact():
+        if loader.ready:
+            st.rerun()
+
+    wait_exact()
+
 # Layout principal - graphiques circulaires sur la même ligne
 # Première section: Filtre région
 st.markdown("""
@@ -277,25 +303,138 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-selected_region = st.selectbox(
-    "Sélectionner une région",
-    options=['Toutes'] + list(df['Région'].unique()),
-    index=0,
-    key="region_filter",
-    label_visibility="hidden"
+with profiler.section('filter'):
+    selected_region = st.selectbox(
+        "Sélectionner une région",
+        options=['Toutes'] + backend.values('Région'),
+        index=0,
+        key="region_filter",
+        label_visibility="hidden"
+    )
+
+# Filtres à choix multiples (aucune valeur retenue = pas de filtre), résolus par index bitmap
+FILTER_LABELS = {
+    'Segment': 'Segment',
+    'Catégorie': 'Catégorie',
+    'Sous-Catégorie': 'Sous-Catégorie',
+    'Mode Expédition': "Mode d'Expédition",
+    'Mode Paiement': 'Mode de Paiement',
+    'Année': 'Année',
+}
+FILTER_KEYS = {
+    'Segment': 'segment_filter',
+    'Catégorie': 'category_filter',
+    'Sous-Catégorie': 'subcategory_filter',
+    'Mode Expédition': 'ship_mode_filter',
+    'Mode Paiement': 'payment_filter',
+    'Année': 'year_filter',
+}
+
+filters = {}
+with profiler.section('filter:multi'):
+    for column, col in zip(FILTER_COLUMNS, st.columns(len(FILTER_COLUMNS))):
+        with col:
+            filters[column] = st.multiselect(
+                FILTER_LABELS[column],
+                options=backend.values(column),
+                key=FILTER_KEYS[column],
+                placeholder="Toutes"
+            )
+
+# Période : préréglages glissants jusqu'au dernier jour de données, ou plage choisie
+first_day, last_day = backend.date_bounds()
+period_col, range_col = st.columns([1, 2])
+with period_col:
+    preset = st.selectbox(
+        "Période",
+        options=PERIOD_PRESETS,
+        index=0,
+        key="period_preset"
+    )
+dates = preset_range(preset, first_day, last_day)
+if preset == 'Personnalisée':
+    with range_col:
+        picked = st.date_input(
+            "Plage de dates",
+            value=(first_day.item(), last_day.item()),
+            min_value=first_day.item(),
+            max_value=last_day.item(),
+            key="period_range"
+        )
+    # Tant que la seconde borne n'est pas choisie, la période entière reste affichée
+    if len(picked) == 2:
+        dates = (to_day(picked[0]), to_day(picked[1]))
+
+filtered = any(filters.values()) or dates is not None
+
+# Tables des graphiques et métriques, calculées en une passe par le moteur seulement si une figure
+# manque au cache (le moteur pandas ne lit que le cube, jamais les commandes détaillées)
+tables = {}
+
+def table(name):
+    if not tables:
+        rows = backend.rows(selected_region, filters, dates) if profiler.enabled else None
+        with profiler.section('aggregate', rows=rows):
+            tables.update(backend.tables(selected_region, filters=filters, dates=dates))
+    return tables[name]
+
+def table_chart(chart_id):
+    name, build = TABLE_CHARTS[chart_id]
+    return build(table(name))
+
+# Instantané pré-rendu de la région (python snapshots.py), lu au premier besoin et seulement
+# s'il correspond à la version courante du jeu ; les vues filtrées (choix multiples, période) sont
+# toujours calculées
+snapshot = {}
+
+def snapshot_chart(chart_id):
+    if filtered:
+        return None
+    if 'view' not in snapshot:
+        snapshot['view'] = load_snapshot(SNAPSHOT_DIR, selected_region, backend.version, POINT_BUDGET)
+    return snapshot['view'].get(chart_id) if snapshot['view'] else None
+
+# Figure servie par le cache ; en cas d'absence, reprise de l'instantané ou construction
+filter_state = ((selected_region,) + tuple(tuple(sorted(filters[column])) for column in FILTER_COLUMNS)
+                + (tuple(str(d) for d in dates) if dates else None,))
+
+def chart(chart_id, build):
+    def timed_build():
+        with profiler.section(f'snapshot:{chart_id}') as record:
+            value = snapshot_chart(chart_id)
+            record['hit'] = value is not None
+        if value is not None:
+            return value
+        with profiler.section(f'build:{chart_id}'):
+            return build()
+    with profiler.section(f'figure:{chart_id}'):
+        return figure_cache.get((backend.version, chart_id, filter_state), timed_build)
+
+# Envoi d'une figure au navigateur ; en profilage, on mesure aussi la taille du JSON envoyé
+# Les options (key, on_select...) sont transmises à st.plotly_chart, dont l'état de sélection est renvoyé
+# Clé par défaut : l'identifiant du graphique (deux figures vides identiques auraient sinon le même
+# identifiant automatique)
+def render(chart_id, fig, **options):
+    options = {'key': chart_id, **options}
+    with profiler.section(f'render:{chart_id}') as record:
+        event = st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False}, **options)
+    if profiler.enabled:
+        record['bytes'] = len(pio.to_json(fig, validate=False))
+    return event
+
+# Calculer les métriques (délais de livraison : moyenne et quantiles lus sur les histogrammes du cube)
+total_sales, total_profit, total_quantity, avg_delivery, p50_delivery, p90_delivery, p99_delivery = chart(
+    'kpis', lambda: kpi_values(table)
 )
 
-# Filtrer les données
-if selected_region != 'Toutes':
-    filtered_df = df[df['Région'] == selected_region]
-else:
-    filtered_df = df
+# Marges d'erreur des KPI approchés (demi-largeur de l'intervalle à 95 %)
+approx = '≈ ' if backend.approximate else ''
+margins = backend.margins(selected_region, filters, dates) if backend.approximate else {}
 
-# Calculer les métriques
-total_sales = filtered_df['Ventes'].sum()
-total_profit = filtered_df['Profit'].sum()
-total_quantity = filtered_df['Quantité'].sum()
-avg_delivery = filtered_df['Livraison Moyenne'].mean()
+def margin(measure, scale, digits, suffix):
+    if measure not in margins:
+        return ''
+    return f'<div class="metric-margin">± {margins[measure] / scale:.{digits}f}{suffix}</div>'
 
 # Ligne de séparation
 st.markdown('<div class="section-separator"></div>', unsafe_allow_html=True)
@@ -307,115 +446,24 @@ with col1:
     st.markdown('<div class="small-chart-container">', unsafe_allow_html=True)
     st.markdown('<h3 style="color: #74b9ff; text-align: center; margin-bottom: 15px; font-weight: bold;">Somme des Ventes par Région</h3>', unsafe_allow_html=True)
     
-    region_sales = filtered_df.groupby('Région')['Ventes'].sum().reset_index()
-    region_sales['Percentage'] = (region_sales['Ventes'] / region_sales['Ventes'].sum() * 100).round(0).astype(int)
-    
-    fig_region = px.pie(
-        region_sales, 
-        values='Ventes', 
-        names='Région',
-        color_discrete_sequence=['#00b894', '#74b9ff', '#fd79a8', '#fdcb6e']
-    )
-    fig_region.update_traces(
-        textposition='inside', 
-        textinfo='label+percent',
-        textfont=dict(color='black', size=13, family='Arial Bold'),
-        marker=dict(line=dict(color='#1a1d29', width=2)),
-        pull=[0.05, 0.05, 0.05, 0.05]
-    )
-    fig_region.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='black', size=12),
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05,
-            font=dict(color='black', size=11, family='Arial Bold')
-        ),
-        height=280,
-        margin=dict(t=20, b=20, l=20, r=80)
-    )
-    st.plotly_chart(fig_region, use_container_width=True, config={'displayModeBar': False})
+    fig_region = chart('region_pie', lambda: table_chart('region_pie'))
+    render('region_pie', fig_region)
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col2:
     st.markdown('<div class="small-chart-container">', unsafe_allow_html=True)
     st.markdown('<h3 style="color: #74b9ff; text-align: center; margin-bottom: 15px; font-weight: bold;">Somme des Ventes par Segment</h3>', unsafe_allow_html=True)
     
-    segment_sales = filtered_df.groupby('Segment')['Ventes'].sum().reset_index()
-    
-    fig_segment = px.pie(
-        segment_sales, 
-        values='Ventes', 
-        names='Segment',
-        color_discrete_sequence=['#74b9ff', '#fdcb6e', '#fd79a8']
-    )
-    fig_segment.update_traces(
-        textposition='inside', 
-        textinfo='label+percent',
-        textfont=dict(color='black', size=13, family='Arial Bold'),
-        marker=dict(line=dict(color='#1a1d29', width=2)),
-        pull=[0.05, 0.05, 0.05]
-    )
-    fig_segment.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='black', size=12),
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05,
-            font=dict(color='black', size=11, family='Arial Bold')
-        ),
-        height=280,
-        margin=dict(t=20, b=20, l=20, r=80)
-    )
-    st.plotly_chart(fig_segment, use_container_width=True, config={'displayModeBar': False})
+    fig_segment = chart('segment_pie', lambda: table_chart('segment_pie'))
+    render('segment_pie', fig_segment)
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col3:
     st.markdown('<div class="small-chart-container">', unsafe_allow_html=True)
     st.markdown('<h3 style="color: #74b9ff; text-align: center; margin-bottom: 15px; font-weight: bold;">Somme des Ventes par Mode de Paiement</h3>', unsafe_allow_html=True)
     
-    payment_sales = filtered_df.groupby('Mode Paiement')['Ventes'].sum().reset_index()
-    
-    fig_payment = px.pie(
-        payment_sales, 
-        values='Ventes', 
-        names='Mode Paiement',
-        color_discrete_sequence=['#00b894', '#fdcb6e', '#74b9ff']
-    )
-    fig_payment.update_traces(
-        textposition='inside', 
-        textinfo='label+percent',
-        textfont=dict(color='black', size=13, family='Arial Bold'),
-        marker=dict(line=dict(color='#1a1d29', width=2)),
-        pull=[0.05, 0.05, 0.05]
-    )
-    fig_payment.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='black', size=12),
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05,
-            font=dict(color='black', size=11, family='Arial Bold')
-        ),
-        height=280,
-        margin=dict(t=20, b=20, l=20, r=80)
-    )
-    st.plotly_chart(fig_payment, use_container_width=True, config={'displayModeBar': False})
+    fig_payment = chart('payment_pie', lambda: table_chart('payment_pie'))
+    render('payment_pie', fig_payment)
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Ligne de séparation
@@ -428,7 +476,8 @@ with col1:
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-label">Profit</div>
-        <div class="metric-value">{total_profit/1000:.0f}K</div>
+        <div class="metric-value">{approx}{total_profit/1000:.0f}K</div>
+        {margin('Profit', 1000, 0, 'K')}
     </div>
     """, unsafe_allow_html=True)
 
@@ -436,7 +485,8 @@ with col2:
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-label">Ventes</div>
-        <div class="metric-value">{total_sales/1000000:.1f}M</div>
+        <div class="metric-value">{approx}{total_sales/1000000:.1f}M</div>
+        {margin('Ventes', 1000000, 2, 'M')}
     </div>
     """, unsafe_allow_html=True)
 
@@ -444,7 +494,8 @@ with col3:
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-label">Quantité</div>
-        <div class="metric-value">{total_quantity/1000:.0f}K</div>
+        <div class="metric-value">{approx}{total_quantity/1000:.0f}K</div>
+        {margin('Quantité', 1000, 1, 'K')}
     </div>
     """, unsafe_allow_html=True)
 
@@ -452,186 +503,189 @@ with col4:
     st.markdown(f"""
     <div class="metric-card">
         <div class="metric-label">Livraison Moyenne</div>
-        <div class="metric-value">{avg_delivery:.0f}</div>
+        <div class="metric-value">{approx}{format_days(avg_delivery)}</div>
     </div>
     """, unsafe_allow_html=True)
 
-# Ligne de séparation
+# Délais de livraison (date d'expédition - date de commande) : quantiles et distribution par mode
 st.markdown('<div class="section-separator"></div>', unsafe_allow_html=True)
-
-# Graphiques temporels et barres
-st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-st.markdown('<div class="chart-title">Ventes Mensuelles par Année</div>', unsafe_allow_html=True)
-
-monthly_sales = filtered_df.groupby(['Année', 'Mois'])['Ventes'].sum().reset_index()
-
-fig_monthly = go.Figure()
-
-colors = ['#74b9ff', '#fdcb6e', '#00b894']
-for i, year in enumerate(sorted(monthly_sales['Année'].unique())):
-    year_data = monthly_sales[monthly_sales['Année'] == year]
-    fig_monthly.add_trace(go.Scatter(
-        x=year_data['Mois'],
-        y=year_data['Ventes'],
-        mode='lines+markers',
-        name=str(year),
-        line=dict(width=3, color=colors[i % len(colors)]),
-        marker=dict(size=8, color=colors[i % len(colors)])
-    ))
-
-fig_monthly.update_layout(
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(0,0,0,0)',
-    font=dict(color='white'),
-    xaxis=dict(
-        title='',
-        gridcolor='rgba(255,255,255,0.1)',
-        color='white',
-        showgrid=True
-    ),
-    yaxis=dict(
-        title='',
-        gridcolor='rgba(255,255,255,0.1)',
-        color='white',
-        showgrid=True
-    ),
-    legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=1.02,
-        xanchor="right",
-        x=1,
-        font=dict(color='white')
-    ),
-    height=320,
-    margin=dict(t=40, b=40, l=40, r=40)
-)
-st.plotly_chart(fig_monthly, use_container_width=True, config={'displayModeBar': False})
-st.markdown('</div>', unsafe_allow_html=True)
-
-# Graphique Ship Mode
-st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-st.markdown('<div class="chart-title">Ventes par Mode d\'Expédition</div>', unsafe_allow_html=True)
-
-ship_mode_sales = filtered_df.groupby('Mode Expédition')['Ventes'].sum().reset_index()
-ship_mode_sales = ship_mode_sales.sort_values('Ventes', ascending=True)
-
-fig_ship = px.bar(
-    ship_mode_sales,
-    x='Ventes',
-    y='Mode Expédition',
-    orientation='h',
-    color='Mode Expédition',
-    color_discrete_sequence=['#00b894', '#74b9ff', '#fd79a8', '#fdcb6e']
-)
-fig_ship.update_layout(
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(0,0,0,0)',
-    font=dict(color='white'),
-    showlegend=False,
-    xaxis=dict(
-        gridcolor='rgba(255,255,255,0.1)',
-        color='white',
-        title=''
-    ),
-    yaxis=dict(
-        color='white',
-        title=''
-    ),
-    height=320,
-    margin=dict(t=40, b=40, l=40, r=40)
-)
-st.plotly_chart(fig_ship, use_container_width=True, config={'displayModeBar': False})
-st.markdown('</div>', unsafe_allow_html=True)
+delivery_cols = st.columns([1, 1, 1, 3])
+for col, (label, value) in zip(delivery_cols, [("Délai médian", p50_delivery), ("Délai p90", p90_delivery),
+                                               ("Délai p99", p99_delivery)]):
+    with col:
+        st.markdown(f"""
+        <div class="metric-card">
+            <div class="metric-label">{label}</div>
+            <div class="metric-value">{approx}{format_quantile(value)}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+with delivery_cols[3]:
+    st.markdown('<div class="chart-title">Délais de Livraison par Mode d\'Expédition</div>', unsafe_allow_html=True)
+    fig_delivery = chart('delivery_histogram', lambda: table_chart('delivery_histogram'))
+    render('delivery_histogram', fig_delivery)
 
 # Ligne de séparation
 st.markdown('<div class="section-separator"></div>', unsafe_allow_html=True)
 
-# Quatrième ligne: Profit et sous-catégories
-st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-st.markdown('<div class="chart-title">Profit Mensuel par Année</div>', unsafe_allow_html=True)
-
-monthly_profit = filtered_df.groupby(['Année', 'Mois'])['Profit'].sum().reset_index()
-
-fig_profit = go.Figure()
-
-colors = ['#f39c12', '#00b894', '#e74c3c']
-for i, year in enumerate(sorted(monthly_profit['Année'].unique())):
-    year_data = monthly_profit[monthly_profit['Année'] == year]
-    fig_profit.add_trace(go.Scatter(
-        x=year_data['Mois'],
-        y=year_data['Profit'],
-        mode='lines+markers',
-        name=str(year),
-        line=dict(width=3, color=colors[i % len(colors)]),
-        marker=dict(size=8, color=colors[i % len(colors)]),
-        fill='tonexty' if i > 0 else None,
-        fillcolor=f'rgba({int(colors[i][1:3], 16)}, {int(colors[i][3:5], 16)}, {int(colors[i][5:7], 16)}, 0.3)'
-    ))
-
-fig_profit.update_layout(
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(0,0,0,0)',
-    font=dict(color='white'),
-    xaxis=dict(
-        title='',
-        gridcolor='rgba(255,255,255,0.1)',
-        color='white',
-        showgrid=True
-    ),
-    yaxis=dict(
-        title='',
-        gridcolor='rgba(255,255,255,0.1)',
-        color='white',
-        showgrid=True
-    ),
-    legend=dict(
-        orientation="h",
-        yanchor="bottom",
-        y=1.02,
-        xanchor="right",
-        x=1,
-        font=dict(color='white')
-    ),
-    height=320,
-    margin=dict(t=40, b=40, l=40, r=40)
-)
-st.plotly_chart(fig_profit, use_container_width=True, config={'displayModeBar': False})
-st.markdown('</div>', unsafe_allow_html=True)
+# Sections rafraîchies isolément (fragments) : un contrôle placé dans une section ne réexécute que
+# cette section ; les filtres globaux (région, choix multiples, période) réexécutent toute la page
+# et donc toutes les sections. Les figures restent servies par le cache partagé.
+
+# Réexécution partielle : la réexécution complète a déjà écrit ses temps, le fragment écrit les siens
+# sous un nouvel identifiant
+@contextmanager
+def fragment_run(name):
+    global profiler
+    partial = profiler.emitted
+    if partial:
+        profiler = Profiler(profiler.mode)
+    with profiler.section(f'fragment:{name}'):
+        yield
+    if partial:
+        profiler.emit(fragment=name, region=selected_region, version=backend.version)
+
+# Série jour / semaine par granularité, calculée une fois puis réduite au budget de points
+timeline = {}
+
+def series(granularity):
+    if granularity not in timeline:
+        with profiler.section('series', granularity=granularity):
+            timeline[granularity] = backend.series(selected_region, granularity, filters, dates)
+    return timeline[granularity]
+
+def timeline_chart(chart_id, granularity):
+    measure, color = TIMELINE_CHARTS[chart_id]
+    return build_timeline_chart(downsample(series(granularity), measure, POINT_BUDGET), measure, color)
+
+# Courbes de ventes et de profit : seule section qui dépend de la granularité
+@st.fragment
+def timeline_section():
+    with fragment_run('timeline'):
+        # Granularité des courbes de ventes et de profit
+        granularity = st.radio(
+            "Granularité",
+            options=GRANULARITIES,
+            index=0,
+            key="granularity",
+            horizontal=True,
+            label_visibility="collapsed"
+        )
+
+        # Graphiques temporels et barres
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        if granularity == 'Mois':
+            st.markdown('<div class="chart-title">Ventes Mensuelles par Année</div>', unsafe_allow_html=True)
+            fig_monthly = chart('monthly_sales_chart', lambda: table_chart('monthly_sales_chart'))
+            render('monthly_sales_chart', fig_monthly)
+        else:
+            st.markdown(f'<div class="chart-title">Ventes par {granularity}</div>', unsafe_allow_html=True)
+            fig_monthly = chart(f'sales_timeline:{granularity}', lambda: timeline_chart('sales_timeline', granularity))
+            render(f'sales_timeline:{granularity}', fig_monthly)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Graphique Ship Mode
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        st.markdown('<div class="chart-title">Ventes par Mode d\'Expédition</div>', unsafe_allow_html=True)
+
+        fig_ship = chart('ship_mode_bar', lambda: table_chart('ship_mode_bar'))
+        render('ship_mode_bar', fig_ship)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Ligne de séparation
+        st.markdown('<div class="section-separator"></div>', unsafe_allow_html=True)
+
+        # Quatrième ligne: Profit et sous-catégories
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        if granularity == 'Mois':
+            st.markdown('<div class="chart-title">Profit Mensuel par Année</div>', unsafe_allow_html=True)
+            fig_profit = chart('monthly_profit_chart', lambda: table_chart('monthly_profit_chart'))
+            render('monthly_profit_chart', fig_profit)
+        else:
+            st.markdown(f'<div class="chart-title">Profit par {granularity}</div>', unsafe_allow_html=True)
+            fig_profit = chart(f'profit_timeline:{granularity}', lambda: timeline_chart('profit_timeline', granularity))
+            render(f'profit_timeline:{granularity}', fig_profit)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+# Section sous la ligne de flottaison, construite en dernier : le reste de la page est déjà affiché
+# (DASHBOARD_LAZY_SECTIONS=1 pour ne la calculer qu'une fois demandée dans la session)
+@st.fragment
+def subcat_section():
+    with fragment_run('subcat'):
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        st.markdown('<div class="chart-title">Ventes par Sous-Catégorie</div>', unsafe_allow_html=True)
+
+        if LAZY_SECTIONS and not st.toggle("Afficher", key="show_subcat"):
+            st.markdown('</div>', unsafe_allow_html=True)
+            return
+        fig_subcat = chart('subcat_bar', lambda: table_chart('subcat_bar'))
+        event = render('subcat_bar', fig_subcat, key='subcat_select', on_select='rerun', selection_mode='points')
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Une barre cliquée limite le classement à sa sous-catégorie
+        points = event.selection.points if event else []
+        ranking_view(points[0].get('y') if points else None)
+
+# Classement des produits et des clients : seules les k premières lignes sont calculées et envoyées
+RANKING_LABELS = {'Produit': 'Produits', 'Client': 'Clients'}
+
+def ranking_view(sub_category):
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    if backend.approximate:
+        st.caption("Classement des produits et des clients disponible à la fin du chargement.")
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+    column_col, measure_col = st.columns(2)
+    with column_col:
+        column = st.radio(
+            "Détail",
+            options=RANKING_COLUMNS,
+            format_func=RANKING_LABELS.get,
+            key="ranking_column",
+            horizontal=True
+        )
+    with measure_col:
+        measure = st.radio(
+            "Classer par",
+            options=RANKING_MEASURES,
+            key="ranking_measure",
+            horizontal=True
+        )
+    scope = f' — {sub_category}' if sub_category else ''
+    st.markdown(f'<div class="chart-title">Top {TOP_K} {RANKING_LABELS[column]} par {measure}{scope}</div>',
+                unsafe_allow_html=True)
+    if not sub_category:
+        st.caption("Cliquer sur une barre des sous-catégories pour détailler celle-ci.")
+
+    def build():
+        ranking_filters = dict(filters, **({'Sous-Catégorie': [sub_category]} if sub_category else {}))
+        with profiler.section('ranking', column=column, measure=measure):
+            ranking = backend.ranking(column, measure, TOP_K, selected_region, ranking_filters, dates)
+        return build_ranking_bar(ranking, column, measure)
+    chart_id = f'ranking:{column}:{measure}:{sub_category or ""}'
+    render(chart_id, chart(chart_id, build))
+    st.markdown('</div>', unsafe_allow_html=True)
+
+timeline_section()
 
 # Ligne de séparation
 st.markdown('<div class="section-separator"></div>', unsafe_allow_html=True)
 
-st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-st.markdown('<div class="chart-title">Ventes par Sous-Catégorie</div>', unsafe_allow_html=True)
-
-subcat_sales = filtered_df.groupby('Sous-Catégorie')['Ventes'].sum().reset_index()
-subcat_sales = subcat_sales.sort_values('Ventes', ascending=True)
-
-fig_subcat = px.bar(
-    subcat_sales,
-    x='Ventes',
-    y='Sous-Catégorie',
-    orientation='h',
-    color='Sous-Catégorie',
-    color_discrete_sequence=['#fd79a8', '#f39c12', '#74b9ff']
-)
-fig_subcat.update_layout(
-    paper_bgcolor='rgba(0,0,0,0)',
-    plot_bgcolor='rgba(0,0,0,0)',
-    font=dict(color='white'),
-    showlegend=False,
-    xaxis=dict(
-        gridcolor='rgba(255,255,255,0.1)',
-        color='white',
-        title=''
-    ),
-    yaxis=dict(
-        color='white',
-        title=''
-    ),
-    height=320,
-    margin=dict(t=40, b=40, l=40, r=40)
-)
-st.plotly_chart(fig_subcat, use_container_width=True, config={'displayModeBar': False})
-st.markdown('</div>', unsafe_allow_html=True)
+subcat_section()
+
+# Chargement complet lancé une fois la page d'estimations construite, pour ne pas la ralentir
+if backend.approximate:
+    loader.start()
+
+# Profilage : journaux JSON et panneau des temps par section
+if profiler.enabled:
+    capture_path = profiler.stop_capture()
+    profiler.emit(region=selected_region, version=backend.version, capture=capture_path)
+    with st.expander("⏱️ Temps par section", expanded=False):
+        if capture_path:
+            st.caption(f"Profil complet de la réexécution : {capture_path}")
+        st.dataframe(pd.DataFrame([
+            {'section': '  ' * r['depth'] + r['section'], 'ms': r['ms'], 'lignes': r.get('rows'),
+             'octets': r.get('bytes')}
+            for r in profiler.table()
+        ]), use_container_width=True, hide_index=True)
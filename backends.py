@@ -0,0 +1,234 @@
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregation import DASHBOARD_SPECS, aggregate, spec_keys
+from delivery import DELIVERY_BINS, DELIVERY_COLUMNS, DELIVERY_TOTAL, MAX_DELIVERY_DAYS
+from ranking import DEFAULT_TOP_K, RANKING_MEASURES
+from timeseries import resample
+
+try:
+    import duckdb
+except ImportError:  # duckdb est optionnel : seul le moteur pandas est alors disponible
+    duckdb = None
+
+
+# Moteur en mémoire : agrégation du cube pré-calculé d'un Dataset
+class PandasBackend:
+    approximate = False
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    @property
+    def version(self):
+        return self.dataset.version
+
+    def values(self, column):
+        return self.dataset.values(column)
+
+    # Premier et dernier jour de commande
+    def date_bounds(self):
+        days = self.dataset.daily['Jour'].to_numpy()
+        return days.min().astype('datetime64[D]'), days.max().astype('datetime64[D]')
+
+    # Lignes du cube couvrant la sélection (période : mois entiers du cube + bornes agrégées)
+    def _select(self, region, filters, dates):
+        if dates is None:
+            return self.dataset.query(region, filters)
+        return self.dataset.period(region, filters, *dates)
+
+    # Lignes lues pour un filtre (lignes du cube)
+    def rows(self, region='Toutes', filters=None, dates=None):
+        return len(self._select(region, filters, dates))
+
+    # Tables des graphiques et métriques (mêmes formes que aggregation.aggregate)
+    # filters : {colonne: valeurs retenues} pour les filtres à choix multiples
+    # dates : (premier jour, dernier jour) inclus, ou None pour toute la période
+    def tables(self, region='Toutes', specs=DASHBOARD_SPECS, filters=None, dates=None):
+        return aggregate(self._select(region, filters, dates), specs, count_column='Commandes')
+
+    # Ventes et profit au pas du jour ou de la semaine, depuis l'agrégat journalier ; avec des
+    # filtres à choix multiples, depuis les commandes retenues par les bitmaps
+    def series(self, region='Toutes', granularity='Jour', filters=None, dates=None):
+        return resample(self.dataset.daily_between(region, filters, dates), granularity)
+
+    # k premiers produits ou clients selon une mesure (sélection partielle sur les sommes par entité)
+    def ranking(self, column, measure='Ventes', k=DEFAULT_TOP_K, region='Toutes', filters=None, dates=None):
+        return self.dataset.top(column, measure, k, region, filters, dates)
+
+
+# Identifiant SQL entre guillemets (les colonnes sont en français, avec espaces et accents)
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Moteur embarqué : requêtes DuckDB directement sur des fichiers Parquet, hors mémoire
+# Le filtre région est passé en WHERE et poussé jusqu'à la lecture des groupes de lignes Parquet
+class DuckDBBackend:
+    approximate = False
+
+    def __init__(self, path):
+        if duckdb is None:
+            raise ImportError("Le moteur 'duckdb' nécessite le paquet duckdb")
+        self.path = path
+        self._connection = duckdb.connect()
+        self._lock = threading.Lock()
+        self._values = {}
+
+    # Fichiers couverts par le chemin (fichier unique ou motif glob)
+    def files(self):
+        return sorted(glob.glob(self.path)) or [self.path]
+
+    # Version dérivée des fichiers : change dès qu'un fichier est remplacé ou ajouté
+    @property
+    def version(self):
+        parts = []
+        for path in self.files():
+            stat = os.stat(path)
+            parts.append(f'{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}')
+        return 'parquet:' + '|'.join(parts)
+
+    def _source(self):
+        return "read_parquet('{}')".format(self.path.replace("'", "''"))
+
+    # Clause WHERE (et paramètres) du filtre région, des filtres à choix multiples et de la période
+    def _where(self, region, filters, dates=None):
+        clauses, params = [], []
+        if dates is not None:
+            clauses.append('"Date Commande" >= ? AND "Date Commande" < ?')
+            params += [pd.Timestamp(dates[0]).to_pydatetime(), pd.Timestamp(dates[1] + 1).to_pydatetime()]
+        if region != 'Toutes':
+            clauses.append('"Région" = ?')
+            params.append(region)
+        for column, values in (filters or {}).items():
+            if values:
+                clauses.append(f'{quote(column)} IN ({", ".join("?" for _ in values)})')
+                params.extend(v.item() if isinstance(v, np.generic) else v for v in values)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            cursor = self._connection.cursor()
+        try:
+            return cursor.execute(sql, list(params)).df()
+        finally:
+            cursor.close()
+
+    # Valeurs distinctes d'une colonne, mémorisées pour la version courante des fichiers
+    def values(self, column):
+        key = (self.version, column)
+        if key not in self._values:
+            frame = self._query(f'SELECT DISTINCT {quote(column)} AS v FROM {self._source()} '
+                                f'WHERE {quote(column)} IS NOT NULL ORDER BY v')
+            self._values = {k: v for k, v in self._values.items() if k[0] == key[0]}
+            self._values[key] = frame['v'].tolist()
+        return self._values[key]
+
+    # Premier et dernier jour de commande, mémorisés pour la version courante des fichiers
+    def date_bounds(self):
+        key = (self.version, 'Date Commande:bounds')
+        if key not in self._values:
+            frame = self._query(f'SELECT MIN("Date Commande") AS first, MAX("Date Commande") AS last '
+                                f'FROM {self._source()}')
+            self._values[key] = tuple(np.datetime64(frame[c].iloc[0], 'D') for c in ('first', 'last'))
+        return self._values[key]
+
+    # Ventes et profit au pas du jour ou de la semaine, calculés par DuckDB
+    def series(self, region='Toutes', granularity='Jour', filters=None, dates=None):
+        unit = {'Jour': 'day', 'Semaine': 'week'}[granularity]
+        where, params = self._where(region, filters, dates)
+        sql = (f'SELECT CAST(date_trunc(\'{unit}\', "Date Commande") AS DATE) AS "Date", '
+               'SUM(CAST("Ventes" AS DOUBLE)) AS "Ventes", SUM(CAST("Profit" AS DOUBLE)) AS "Profit" '
+               f'FROM {self._source()}{where} GROUP BY 1 ORDER BY 1')
+        series = self._query(sql, params)
+        series['Date'] = pd.to_datetime(series['Date']).astype('datetime64[s]')
+        return series
+
+    # k premiers produits ou clients : ORDER BY ... LIMIT, que DuckDB exécute en sélection partielle
+    def ranking(self, column, measure='Ventes', k=DEFAULT_TOP_K, region='Toutes', filters=None, dates=None):
+        where, params = self._where(region, filters, dates)
+        sums = ', '.join(f'SUM(CAST({quote(m)} AS DOUBLE)) AS {quote(m)}' for m in RANKING_MEASURES)
+        sql = (f'SELECT {quote(column)}, {sums} FROM {self._source()}{where} '
+               f'GROUP BY 1 ORDER BY {quote(measure)} DESC LIMIT {int(k)}')
+        table = self._query(sql, params)
+        table[column] = table[column].astype(object)
+        return table
+
+    # Lignes lues pour un filtre : inconnu sans parcourir les fichiers
+    def rows(self, region='Toutes', filters=None, dates=None):
+        return None
+
+    # Histogrammes des délais de livraison par groupe : nombre de commandes par (clés, délai), plus la
+    # somme exacte des délais (non plafonnés) pour le délai moyen
+    def _histogram(self, keys, measure, where, params):
+        keys = list(keys)
+        columns = ''.join(f'{quote(key)}, ' for key in keys)
+        condition = f'{quote(measure)} >= 0'
+        where = f'{where} AND {condition}' if where else f' WHERE {condition}'
+        sql = (f'SELECT {columns}LEAST({quote(measure)}, {MAX_DELIVERY_DAYS}) AS __bin, COUNT(*) AS __rows, '
+               f'SUM(CAST({quote(measure)} AS DOUBLE)) AS __total '
+               f'FROM {self._source()}{where} GROUP BY ALL')
+        result = self._query(sql, params)
+        table = result.pivot_table(index=keys, columns='__bin', values='__rows', aggfunc='sum',
+                                   fill_value=0, observed=True)
+        table = table.reindex(columns=range(DELIVERY_BINS), fill_value=0).astype(np.int64)
+        table.columns = DELIVERY_COLUMNS
+        totals = result.groupby(keys, observed=True)['__total'].sum()
+        table[DELIVERY_TOTAL] = totals.reindex(table.index).to_numpy(dtype=np.float64)
+        return table.reset_index()
+
+    # Toutes les tables en une seule requête (GROUPING SETS), soit un seul parcours des fichiers,
+    # plus une requête pour les histogrammes des délais
+    def tables(self, region='Toutes', specs=DASHBOARD_SPECS, filters=None, dates=None):
+        where, params = self._where(region, filters, dates)
+        histograms = {name: self._histogram(spec_keys(keys), measure, where, params)
+                      for name, (keys, measure, reducer) in specs.items() if reducer == 'histogram'}
+        specs = {name: spec for name, spec in specs.items() if spec[2] != 'histogram'}
+        key_sets = list(dict.fromkeys(spec_keys(keys) for keys, _, _ in specs.values()))
+        columns = list(dict.fromkeys(column for keys in key_sets for column in keys))
+        measures = list(dict.fromkeys(measure for _, measure, _ in specs.values()))
+
+        select = [quote(column) for column in columns]
+        if columns:
+            select.append(f'GROUPING({", ".join(quote(c) for c in columns)}) AS __grouping')
+        else:
+            select.append('0 AS __grouping')
+        select += [f'SUM(CAST({quote(m)} AS DOUBLE)) AS {quote(m)}' for m in measures]
+        select.append('COUNT(*) AS __rows')
+        sets = ', '.join('(' + ', '.join(quote(c) for c in keys) + ')' for keys in key_sets)
+
+        sql = f'SELECT {", ".join(select)} FROM {self._source()}{where} GROUP BY GROUPING SETS ({sets})'
+        result = self._query(sql, params)
+
+        results = histograms
+        for name, (keys, measure, reducer) in specs.items():
+            keys = spec_keys(keys)
+            # GROUPING() met à 1 le bit des colonnes absentes du regroupement (1re colonne = bit de poids fort)
+            mask = sum(1 << (len(columns) - 1 - i) for i, c in enumerate(columns) if c not in keys)
+            rows = result[(result['__grouping'] == mask) & (result['__rows'] > 0)]
+            if reducer == 'sum':
+                values = rows[measure].fillna(0.0)
+            elif reducer == 'count':
+                values = rows['__rows']
+            elif reducer == 'mean':
+                values = rows[measure] / rows['__rows']
+            else:
+                raise ValueError(f"Réducteur inconnu : {reducer}")
+
+            if not keys:
+                if len(values):
+                    results[name] = values.iloc[0]
+                else:
+                    results[name] = float('nan') if reducer == 'mean' else 0.0
+                continue
+            table = rows[list(keys)].copy()
+            for key in keys:
+                if pd.api.types.is_numeric_dtype(table[key]):
+                    table[key] = table[key].astype(np.int64)
+            table[measure] = values.to_numpy()
+            results[name] = table.sort_values(list(keys)).reset_index(drop=True)
+        return results
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'application.py')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+DEFAULT_SCALES = [10_000, 1_000_000, 10_000_000]
+
+
+# Scénarios : jeu simulé à chaque échelle, plus le fichier DONNEESS.xlsx
+def scenarios(scales, include_real=True):
+    items = [{'name': f'synthetic-{rows}', 'env': {'DASHBOARD_SOURCE': 'synthetic', 'DASHBOARD_ROWS': str(rows)},
+              'rows': rows} for rows in scales]
+    if include_real:
+        items.append({'name': 'real', 'env': {'DASHBOARD_SOURCE': 'real'}, 'rows': None})
+    return items
+
+
+# RSS maximal du processus courant, en octets (ru_maxrss est en Ko sous Linux, en octets sous macOS)
+def peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Exécution d'un scénario dans le processus courant : démarrage à froid, puis changement de région
+# (premier passage = figures à construire, second passage = figures en cache), puis une sélection vide
+def run_scenario(reruns, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    start = time.perf_counter()
+    app.run()
+    cold = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    regions = list(app.selectbox(key='region_filter').options)
+    passes = []
+    for _ in range(reruns):
+        timings = {}
+        for region in regions[1:] + regions[:1]:
+            start = time.perf_counter()
+            app.selectbox(key='region_filter').select(region).run()
+            timings[region] = time.perf_counter() - start
+            if app.exception:
+                raise RuntimeError(app.exception[0].message)
+        passes.append(timings)
+
+    # Sélection sans aucune commande (première année, 90 derniers jours du jeu) : la page doit
+    # s'afficher, figures vides comprises
+    app.multiselect(key='year_filter').select(app.multiselect(key='year_filter').options[0])
+    start = time.perf_counter()
+    app.selectbox(key='period_preset').select('90 derniers jours').run()
+    empty = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    return {
+        'cold_start_s': cold,
+        'rerun_s': passes,
+        'rerun_mean_s': [sum(p.values()) / len(p) for p in passes],
+        'empty_selection_s': empty,
+        'peak_rss_bytes': peak_rss(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# Chaque scénario tourne dans un processus neuf : caches vides et RSS mesuré isolément
+def run_all(items, reruns, timeout):
+    results = []
+    for item in items:
+        env = dict(os.environ, **item['env'])
+        command = [sys.executable, __file__, '--child', '--reruns', str(reruns), '--timeout', str(timeout)]
+        print(f"{item['name']} ...", file=sys.stderr, flush=True)
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        entry = {'scenario': item['name'], 'rows': item['rows']}
+        if proc.returncode == 0:
+            entry.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+        else:
+            entry['error'] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'échec'
+        results.append(entry)
+    return results
+
+
+# Comparaison de deux fichiers de résultats : rapport nouveau / référence par scénario
+def compare(baseline_path, current_path):
+    with open(baseline_path) as f:
+        baseline = {r['scenario']: r for r in json.load(f)['results']}
+    with open(current_path) as f:
+        current = {r['scenario']: r for r in json.load(f)['results']}
+    print(f"{'scénario':<24}{'mesure':<18}{'référence':>12}{'actuel':>12}{'ratio':>8}")
+    for name, entry in current.items():
+        if name not in baseline or 'error' in entry or 'error' in baseline[name]:
+            continue
+        for metric in ('cold_start_s', 'peak_rss_bytes'):
+            old, new = baseline[name][metric], entry[metric]
+            print(f'{name:<24}{metric:<18}{old:>12.4g}{new:>12.4g}{new / old:>8.2f}')
+        old, new = baseline[name]['rerun_mean_s'], entry['rerun_mean_s']
+        for i, (a, b) in enumerate(zip(old, new)):
+            print(f'{name:<24}{f"rerun_pass_{i}":<18}{a:>12.4g}{b:>12.4g}{b / a:>8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai des réexécutions complètes du tableau de bord")
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help="nombres de commandes simulées, séparés par des virgules")
+    parser.add_argument('--no-real', action='store_true', help="ne pas mesurer DONNEESS.xlsx")
+    parser.add_argument('--reruns', type=int, default=2, help="passages sur toutes les régions")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--output', help="fichier JSON de résultats (défaut : benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('REFERENCE', 'ACTUEL'))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.child:
+        print(json.dumps(run_scenario(args.reruns, args.timeout)))
+        return
+
+    scales = [int(s) for s in args.scales.split(',') if s]
+    results = run_all(scenarios(scales, not args.no_real), args.reruns, args.timeout)
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bench_dashboard import APP_PATH, RESULTS_DIR, git_commit
+
+try:
+    import websockets
+except ImportError:  # websockets est optionnel : seul ce test de charge en a besoin
+    websockets = None
+
+DEFAULT_SESSIONS = [1, 2, 4, 8]
+DEFAULT_DURATION = 10.0
+PERCENTILES = (50, 95, 99)
+
+# Canal des sessions (messages protobuf BackMsg / ForwardMsg) et sonde de disponibilité du serveur
+STREAM_PATH = '/_stcore/stream'
+HEALTH_PATH = '/_stcore/health'
+
+
+# Scénarios d'interaction : à chaque étape, une session modifie un widget ; la réexécution suit
+def cycle_regions(session, step):
+    options = session.options['region_filter']
+    session.select('region_filter', options[(step + 1) % len(options)])
+
+
+# Navigation mêlée : région, granularité des courbes, filtre segment (ajout puis retrait), période
+def browse(session, step):
+    action = step % 4
+    if action == 0:
+        cycle_regions(session, step // 4)
+    elif action == 1:
+        options = session.options['granularity']
+        session.select('granularity', options[(step // 4 + 1) % len(options)])
+    elif action == 2:
+        selected = session.states.get('segment_filter')
+        session.select_many('segment_filter', [] if selected and selected.string_array_value.data
+                            else session.options['segment_filter'][:1])
+    else:
+        # La plage personnalisée attend un choix de dates : elle est sautée
+        options = [option for option in session.options['period_preset'] if option != 'Personnalisée']
+        session.select('period_preset', options[(step // 4 + 1) % len(options)])
+
+
+SCRIPTS = {
+    'regions': cycle_regions,
+    'navigation': browse,
+}
+
+
+# Une session de navigateur : connexion WebSocket au serveur, réexécutions demandées avec l'état
+# de tous les widgets déjà modifiés, comme le fait l'interface
+class Session:
+    def __init__(self, url):
+        self.url = url
+        self.connection = None
+        self.page_hash = ''
+        self.options = {}
+        self.ids = {}
+        self.states = {}
+        self.latencies = []
+        self.sizes = []
+        self.errors = []
+
+    async def open(self, timeout):
+        self.connection = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None,
+                                                   open_timeout=timeout)
+        return await self.rerun(timeout)
+
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.close()
+
+    def _state(self, key):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=self.ids[key])
+        self.states[key] = state
+        return state
+
+    def select(self, key, value):
+        self._state(key).string_value = str(value)
+
+    def select_many(self, key, values):
+        self._state(key).string_array_value.data[:] = [str(v) for v in values]
+
+    # Widgets à clé (selectbox, radio, multiselect) : identifiant et options, relevés à chaque passage
+    def _discover(self, element):
+        kind = element.WhichOneof('type')
+        if kind not in ('selectbox', 'radio', 'multiselect'):
+            return
+        widget = getattr(element, kind)
+        key = widget.id.rsplit('-', 1)[-1]
+        self.ids[key] = widget.id
+        self.options[key] = list(widget.options)
+
+    # Réexécution : durée jusqu'au message script_finished et octets reçus ; une exception affichée
+    # par le script compte comme erreur
+    async def rerun(self, timeout):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.page_script_hash = self.page_hash
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        size = 0
+        await self.connection.send(message.SerializeToString())
+        while True:
+            data = await asyncio.wait_for(self.connection.recv(), timeout)
+            size += len(data)
+            received = ForwardMsg()
+            received.ParseFromString(data)
+            kind = received.WhichOneof('type')
+            if kind == 'new_session':
+                self.page_hash = received.new_session.main_script_hash
+            elif kind == 'delta' and received.delta.WhichOneof('type') == 'new_element':
+                element = received.delta.new_element
+                if element.WhichOneof('type') == 'exception':
+                    self.errors.append(element.exception.message)
+                self._discover(element)
+            elif kind == 'script_finished':
+                if received.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors.append('erreur de compilation')
+                return time.perf_counter() - start, size
+
+    async def interact(self, script, deadline, timeout):
+        step = 0
+        while time.perf_counter() < deadline:
+            script(self, step)
+            try:
+                elapsed, size = await self.rerun(timeout)
+            except (asyncio.TimeoutError, websockets.ConnectionClosed) as error:
+                self.errors.append(repr(error))
+                return
+            self.latencies.append(elapsed)
+            self.sizes.append(size)
+            step += 1
+
+
+# RSS courant d'un processus, en octets (Linux : /proc ; None ailleurs)
+def process_rss(pid):
+    if pid is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Serveur application.py lancé en sous-processus (streamlit run), prêt quand la sonde répond
+def start_server(port, timeout):
+    command = [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+               '--server.port', str(port), '--server.address', '127.0.0.1',
+               '--browser.gatherUsageStats', 'false']
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"le serveur s'est arrêté (code {server.returncode})")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}{HEALTH_PATH}', timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('le serveur ne répond pas')
+
+
+# Un palier : n sessions ouvertes ensemble (premier affichage), puis mesurées pendant `duration`
+# secondes ; le serveur reste le même d'un palier à l'autre, ses caches (jeu, figures) restent chauds
+async def run_level(url, sessions, script, duration, timeout, pid, baseline_rss):
+    before = process_rss(pid)
+    clients = [Session(url) for _ in range(sessions)]
+    opened = await asyncio.gather(*(client.open(timeout) for client in clients), return_exceptions=True)
+    ready = [client for client, result in zip(clients, opened) if not isinstance(result, BaseException)]
+    started_rss = process_rss(pid)
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(client.interact(script, begin + duration, timeout) for client in ready))
+    elapsed = time.perf_counter() - begin
+    end_rss = process_rss(pid)
+    await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+
+    latencies = np.array([t for client in ready for t in client.latencies])
+    sizes = [s for client in ready for s in client.sizes]
+    errors = ([repr(result) for result in opened if isinstance(result, BaseException)]
+              + [e for client in clients for e in client.errors])
+    firsts = [result[0] for result in opened if not isinstance(result, BaseException)]
+    result = {
+        'sessions': sessions,
+        'reruns': int(len(latencies)),
+        'elapsed_s': elapsed,
+        'reruns_per_s': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'first_run_max_s': max(firsts) if firsts else None,
+        'latency_mean_s': float(latencies.mean()) if len(latencies) else None,
+        'bytes_per_rerun': float(np.mean(sizes)) if sizes else None,
+        'rss_bytes': end_rss,
+        'rss_growth_bytes': end_rss - baseline_rss if end_rss is not None else None,
+        'rss_per_session_bytes': (started_rss - before) / sessions if started_rss is not None else None,
+        'errors': len(errors),
+    }
+    for p in PERCENTILES:
+        result[f'latency_p{p}_s'] = float(np.percentile(latencies, p)) if len(latencies) else None
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+def ms(value):
+    return '–' if value is None else f'{value * 1000:.0f}'
+
+
+def mib(value):
+    return '–' if value is None else f'{value / 2**20:.0f}'
+
+
+def report_line(result):
+    return (f"{result['sessions']:>9}{result['reruns']:>9}{result['reruns_per_s']:>11.2f}"
+            f"{ms(result['latency_p50_s']):>9}{ms(result['latency_p95_s']):>9}{ms(result['latency_p99_s']):>9}"
+            f"{mib(result['rss_bytes']):>10}{mib(result['rss_growth_bytes']):>10}{result['errors']:>8}")
+
+
+async def run_all(url, levels, script, duration, timeout, pid):
+    baseline_rss = process_rss(pid)
+    print(f"{'sessions':>9}{'reruns':>9}{'reruns/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'RSS Mo':>10}{'+RSS Mo':>10}{'erreurs':>8}", file=sys.stderr, flush=True)
+    results = []
+    for sessions in levels:
+        result = await run_level(url, sessions, script, duration, timeout, pid, baseline_rss)
+        results.append(result)
+        print(report_line(result), file=sys.stderr, flush=True)
+    return baseline_rss, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge : sessions simultanées sur un serveur")
+    parser.add_argument('--sessions', default=','.join(str(n) for n in DEFAULT_SESSIONS),
+                        help="nombres de sessions simultanées, séparés par des virgules")
+    parser.add_argument('--script', choices=sorted(SCRIPTS), default='regions',
+                        help="scénario d'interaction de chaque session")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help="durée de mesure de chaque palier, en secondes")
+    parser.add_argument('--url', help="serveur déjà lancé (ex. http://localhost:8501) ; "
+                                      "sinon application.py est lancé sur un port libre")
+    parser.add_argument('--source', help="DASHBOARD_SOURCE du serveur lancé (défaut : environnement)")
+    parser.add_argument('--rows', type=int, help="DASHBOARD_ROWS du serveur lancé (défaut : environnement)")
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--output', help="fichier JSON de résultats (défaut : benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+
+    if websockets is None:
+        parser.error("le test de charge nécessite le paquet websockets")
+    if args.source:
+        os.environ['DASHBOARD_SOURCE'] = args.source
+    if args.rows:
+        os.environ['DASHBOARD_ROWS'] = str(args.rows)
+
+    levels = [int(n) for n in args.sessions.split(',') if n]
+    server = None
+    if args.url:
+        base = args.url.rstrip('/')
+    else:
+        port = free_port()
+        server = start_server(port, args.timeout)
+        base = f'http://127.0.0.1:{port}'
+    url = base.replace('http', 'ws', 1) + STREAM_PATH
+    try:
+        # La mémoire n'est mesurée que pour un serveur lancé ici
+        baseline_rss, results = asyncio.run(run_all(url, levels, SCRIPTS[args.script], args.duration,
+                                                    args.timeout, server.pid if server else None))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'script': args.script,
+        'duration_s': args.duration,
+        'server': args.url or 'local',
+        'source': os.environ.get('DASHBOARD_SOURCE', 'synthetic'),
+        'rows': os.environ.get('DASHBOARD_ROWS'),
+        'baseline_rss_bytes': baseline_rss,
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f'load-{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
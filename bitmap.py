@@ -0,0 +1,42 @@
+import numpy as np
+
+from aggregation import column_codes
+
+
+# Index bitmap : pour chaque colonne indexée, un tableau de bits compacté (np.packbits) par valeur
+# Une combinaison de filtres se résout par OU / ET bit à bit, sans relire les colonnes
+class BitmapIndex:
+    def __init__(self, frame, columns):
+        self.size = len(frame)
+        self._bitmaps = {}
+        for column in columns:
+            codes, uniques, _ = column_codes(frame[column])
+            self._bitmaps[column] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+
+    # Bits d'un filtre sur une colonne : OU des bitmaps des valeurs retenues
+    def union(self, column, values):
+        bitmaps = self._bitmaps[column]
+        result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            bitmap = bitmaps.get(value)
+            if bitmap is not None:
+                np.bitwise_or(result, bitmap, out=result)
+        return result
+
+    # Bits des lignes retenues par {colonne: valeurs} : OU entre les valeurs d'une colonne,
+    # ET entre les colonnes ; None si aucun filtre ne restreint la sélection
+    def mask(self, filters):
+        result = None
+        for column, values in filters.items():
+            if not values:
+                continue
+            bits = self.union(column, values)
+            result = bits if result is None else np.bitwise_and(result, bits, out=result)
+        return result
+
+    # Positions (croissantes) des lignes retenues ; None si aucun filtre ne s'applique
+    def rows(self, filters):
+        mask = self.mask(filters)
+        if mask is None:
+            return None
+        return np.flatnonzero(np.unpackbits(mask, count=self.size))
@@ -0,0 +1,144 @@
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou, l'écriture atomique suffit à la cohérence
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pyarrow est optionnel : sans lui on relit toujours la source
+    pa = None
+
+# À incrémenter quand le contenu mis en cache change de forme
+CACHE_FORMAT = 3
+METADATA_KEY = b'tableau_de_bord.cache'
+
+
+# Chemin du fichier colonnaire placé à côté de la source (DONNEESS.xlsx -> DONNEESS.arrow)
+def cache_path_for(source):
+    return os.path.splitext(source)[0] + '.arrow'
+
+
+# Clé d'invalidation : chemin, date de modification et taille de la source
+def source_key(source, tag=''):
+    stat = os.stat(source)
+    return {
+        'source': os.path.abspath(source),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'format': CACHE_FORMAT,
+        'tag': tag,
+    }
+
+
+# Lecture de la clé seule (le schéma est en tête de fichier, aucune donnée n'est lue)
+def read_key(path):
+    with pa.memory_map(path, 'r') as source:
+        metadata = ipc.open_file(source).schema.metadata or {}
+    raw = metadata.get(METADATA_KEY)
+    return json.loads(raw) if raw else None
+
+
+# Lecture du fichier Arrow IPC en mémoire mappée
+def read_arrow(path):
+    with pa.memory_map(path, 'r') as source:
+        table = ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+# Lecture sans copie : les colonnes restent des vues en lecture seule sur le fichier mappé, partagées
+# par tous les processus qui le lisent via le cache de pages du système
+# Les chaînes restent au format Arrow (dtype str adossé à pyarrow) au lieu d'objets Python
+def map_arrow(path):
+    table = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    string_dtype = pd.StringDtype('pyarrow', na_value=np.nan)
+    types = {pa.string(): string_dtype, pa.large_string(): string_dtype}
+    return table.to_pandas(split_blocks=True, types_mapper=types.get)
+
+
+# Écriture atomique : fichier temporaire puis renommage, pour ne jamais exposer un cache partiel
+def write_arrow(frame, path, key):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(key).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Charge `source` via le cache colonnaire, en appelant build(source) seulement si la source a changé
+def cached_frame(source, build, tag=''):
+    if pa is None:
+        return build(source)
+
+    key = source_key(source, tag)
+    path = cache_path_for(source)
+    if os.path.exists(path):
+        try:
+            if read_key(path) == key:
+                return read_arrow(path)
+        except (OSError, pa.ArrowException, ValueError):
+            pass  # cache illisible : on le reconstruit
+
+    frame = build(source)
+    try:
+        write_arrow(frame, path, key)
+    except (OSError, pa.ArrowException):
+        pass  # répertoire en lecture seule : on sert les données sans cache
+    return frame
+
+
+# Verrou exclusif entre processus (sans effet si fcntl est indisponible)
+@contextmanager
+def file_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _map_if_current(path, key):
+    try:
+        if os.path.exists(path) and read_key(path) == key:
+            return map_arrow(path)
+    except (OSError, pa.ArrowException, ValueError):
+        pass  # fichier illisible : on le réécrit
+    return None
+
+
+# Jeu partagé entre processus : le premier qui trouve le fichier absent ou périmé appelle build()
+# et l'écrit (les autres attendent le verrou), puis chacun le mappe en mémoire sans copie
+# Un fichier remplacé reste lisible par les processus qui le mappent encore (renommage atomique)
+def shared_frame(path, key, build):
+    if pa is None:
+        return build()
+    frame = _map_if_current(path, key)
+    if frame is not None:
+        return frame
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with file_lock(f'{path}.lock'):
+        frame = _map_if_current(path, key)
+        if frame is not None:
+            return frame
+        write_arrow(build(), path, key)
+    return map_arrow(path)
@@ -0,0 +1,314 @@
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from delivery import DELIVERY_COLUMNS, MAX_DELIVERY_DAYS, delivery_summary
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : plotly sérialise alors avec le module json
+    orjson = None
+
+# Sérialisation des figures (st.plotly_chart, instantanés) par orjson lorsqu'il est installé
+if orjson is not None:
+    pio.json.config.default_engine = 'orjson'
+
+TRANSPARENT = 'rgba(0,0,0,0)'
+GRID_COLOR = 'rgba(255,255,255,0.1)'
+
+# Modèle Plotly du tableau de bord : styles des traces et couleur des axes, communs à tous les
+# graphiques ; il remplace dans chaque figure le modèle par défaut, bien plus volumineux
+TEMPLATE = 'tableau_de_bord'
+pio.templates[TEMPLATE] = go.layout.Template(
+    layout=dict(
+        xaxis=dict(color='white'),
+        yaxis=dict(color='white')
+    ),
+    data=dict(
+        pie=[go.Pie(
+            textposition='inside',
+            textinfo='label+percent',
+            textfont=dict(color='black', size=13, family='Arial Bold'),
+            marker=dict(line=dict(color='#1a1d29', width=2)),
+            pull=0.05
+        )],
+        scatter=[go.Scatter(
+            mode='lines+markers',
+            line=dict(width=3),
+            marker=dict(size=8, line=dict(width=0))
+        )],
+        scattergl=[go.Scattergl(
+            mode='lines',
+            line=dict(width=2)
+        )]
+    )
+)
+
+# Mises en page des graphiques, fixées dans chaque figure et non dans le modèle : le thème Streamlit
+# du navigateur réécrit fonds, polices, grilles et marges du modèle
+CHART_LAYOUT = dict(
+    template=TEMPLATE,
+    paper_bgcolor=TRANSPARENT,
+    plot_bgcolor=TRANSPARENT,
+    font=dict(color='white'),
+    height=320,
+    margin=dict(t=40, b=40, l=40, r=40)
+)
+PIE_LAYOUT = dict(
+    CHART_LAYOUT,
+    font=dict(color='black', size=12),
+    showlegend=True,
+    legend=dict(
+        orientation="v",
+        yanchor="middle",
+        y=0.5,
+        xanchor="left",
+        x=1.05,
+        font=dict(color='black', size=11, family='Arial Bold')
+    ),
+    height=280,
+    margin=dict(t=20, b=20, l=20, r=80)
+)
+YEAR_LEGEND = dict(
+    orientation="h",
+    yanchor="bottom",
+    y=1.02,
+    xanchor="right",
+    x=1,
+    font=dict(color='white')
+)
+GRID_AXIS = dict(gridcolor=GRID_COLOR, showgrid=True)
+
+
+# Squelette d'une figure pour chaque graphique : mise en page et propriétés fixes des traces,
+# construits une fois ; une figure n'y ajoute que ses tableaux de données
+def pie_skeleton(names, colors):
+    return {
+        'layout': dict(PIE_LAYOUT, piecolorway=colors),
+        'trace': dict(type='pie', hovertemplate=f'{names}=%{{label}}<br>Ventes=%{{value}}<extra></extra>')
+    }
+
+
+def category_bar_skeleton(column, colors):
+    return {
+        'layout': dict(CHART_LAYOUT, showlegend=False, xaxis=dict(gridcolor=GRID_COLOR)),
+        'trace': dict(type='bar', orientation='h', hovertemplate=f'{column}=%{{y}}<br>Ventes=%{{x}}<extra></extra>'),
+        'colors': colors
+    }
+
+
+SKELETONS = {
+    'region_pie': pie_skeleton('Région', ['#00b894', '#74b9ff', '#fd79a8', '#fdcb6e']),
+    'segment_pie': pie_skeleton('Segment', ['#74b9ff', '#fdcb6e', '#fd79a8']),
+    'payment_pie': pie_skeleton('Mode Paiement', ['#00b894', '#fdcb6e', '#74b9ff']),
+    'monthly_sales_chart': {
+        'layout': dict(CHART_LAYOUT, xaxis=GRID_AXIS, yaxis=GRID_AXIS, legend=YEAR_LEGEND),
+        'trace': dict(type='scatter'),
+        'colors': ['#74b9ff', '#fdcb6e', '#00b894']
+    },
+    'monthly_profit_chart': {
+        'layout': dict(CHART_LAYOUT, xaxis=GRID_AXIS, yaxis=GRID_AXIS, legend=YEAR_LEGEND),
+        'trace': dict(type='scatter'),
+        'colors': ['#f39c12', '#00b894', '#e74c3c']
+    },
+    'ship_mode_bar': category_bar_skeleton('Mode Expédition', ['#00b894', '#74b9ff', '#fd79a8', '#fdcb6e']),
+    'subcat_bar': category_bar_skeleton('Sous-Catégorie', ['#fd79a8', '#f39c12', '#74b9ff']),
+    'ranking': {
+        'layout': dict(CHART_LAYOUT, showlegend=False, xaxis=dict(gridcolor=GRID_COLOR), yaxis=dict(type='category')),
+        'trace': dict(type='bar', orientation='h')
+    },
+    'delivery_histogram': {
+        'layout': dict(
+            CHART_LAYOUT,
+            barmode='group',
+            legend=dict(YEAR_LEGEND, xanchor='center', x=0.5),
+            xaxis=dict(title='Jours', type='category'),
+            yaxis=dict(title='% des commandes', gridcolor=GRID_COLOR)
+        ),
+        'trace': dict(type='bar'),
+        'colors': ['#00b894', '#74b9ff', '#fd79a8', '#fdcb6e']
+    },
+    'timeline': {
+        'layout': dict(CHART_LAYOUT, showlegend=False, xaxis=dict(GRID_AXIS, type='date'), yaxis=GRID_AXIS),
+        'trace': dict(type='scattergl')
+    },
+}
+
+
+# Figure d'un squelette : sa mise en page (complétée de `layout`) et ses traces, chacune formée des
+# propriétés fixes du squelette et des données propres à la figure
+def from_skeleton(name, traces, **layout):
+    skeleton = SKELETONS[name]
+    return go.Figure({
+        'data': [dict(skeleton['trace'], **trace) for trace in traces],
+        'layout': dict(skeleton['layout'], **layout) if layout else skeleton['layout']
+    })
+
+
+# Mesures envoyées au navigateur sur le plus petit type qui les conserve au centime près ; Plotly les
+# transmet en tableau typé (base64), float32 en divise la taille par deux
+def compact(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f' and values.dtype.itemsize > 4:
+        narrow = values.astype(np.float32)
+        with np.errstate(over='ignore', invalid='ignore'):
+            if np.allclose(narrow, values, rtol=0, atol=0.005, equal_nan=True):
+                return narrow
+    return values
+
+
+# Dates en millisecondes depuis 1970 sur un axe de type date : un tableau typé au lieu de chaînes ISO
+def epoch_ms(dates):
+    return np.asarray(dates).astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+
+
+# Camembert des ventes par région
+def build_region_pie(region_sales):
+    return pie_chart('region_pie', region_sales, 'Région')
+
+
+# Camembert des ventes par segment
+def build_segment_pie(segment_sales):
+    return pie_chart('segment_pie', segment_sales, 'Segment')
+
+
+# Camembert des ventes par mode de paiement
+def build_payment_pie(payment_sales):
+    return pie_chart('payment_pie', payment_sales, 'Mode Paiement')
+
+
+def pie_chart(name, sales, column):
+    return from_skeleton(name, [dict(labels=sales[column].to_numpy(), values=compact(sales['Ventes']))])
+
+
+# Courbes mensuelles d'une mesure, une trace par année ; pour le profit, chaque année est remplie
+# jusqu'à la précédente
+def monthly_chart(name, monthly, measure, fill=False):
+    colors = SKELETONS[name]['colors']
+    traces = []
+    for i, year in enumerate(sorted(monthly['Année'].unique())):
+        year_data = monthly[monthly['Année'] == year]
+        color = colors[i % len(colors)]
+        trace = dict(
+            x=year_data['Mois'].to_numpy(),
+            y=compact(year_data[measure]),
+            name=str(year),
+            line=dict(color=color),
+            marker=dict(color=color)
+        )
+        if fill:
+            trace['fillcolor'] = f'rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, 0.3)'
+            if i > 0:
+                trace['fill'] = 'tonexty'
+        traces.append(trace)
+    return from_skeleton(name, traces)
+
+
+# Courbes des ventes mensuelles, une trace par année
+def build_monthly_sales_chart(monthly_sales):
+    return monthly_chart('monthly_sales_chart', monthly_sales, 'Ventes')
+
+
+# Courbes du profit mensuel, une trace par année
+def build_monthly_profit_chart(monthly_profit):
+    return monthly_chart('monthly_profit_chart', monthly_profit, 'Profit', fill=True)
+
+
+# Barres horizontales des ventes par catégorie, de la plus faible à la plus forte, une couleur par barre
+def category_bar(name, sales, column):
+    sales = sales.sort_values('Ventes', ascending=True)
+    colors = SKELETONS[name]['colors']
+    return from_skeleton(name, [dict(
+        x=compact(sales['Ventes']),
+        y=sales[column].to_numpy(),
+        marker=dict(color=[colors[i % len(colors)] for i in range(len(sales))])
+    )])
+
+
+# Barres des ventes par mode d'expédition
+def build_ship_mode_bar(ship_mode_sales):
+    return category_bar('ship_mode_bar', ship_mode_sales, 'Mode Expédition')
+
+
+# Barres des ventes par sous-catégorie
+def build_subcat_bar(subcat_sales):
+    return category_bar('subcat_bar', subcat_sales, 'Sous-Catégorie')
+
+
+# Barres des k premiers produits ou clients ; l'autre mesure est reprise au survol
+def build_ranking_bar(ranking, column, measure):
+    other = 'Profit' if measure == 'Ventes' else 'Ventes'
+    ranking = ranking.iloc[::-1]
+
+    return from_skeleton('ranking', [dict(
+        x=compact(ranking[measure]),
+        y=ranking[column].to_numpy(),
+        customdata=compact(ranking[other]),
+        marker=dict(color='#74b9ff' if measure == 'Ventes' else '#f39c12'),
+        hovertemplate=f'%{{y}}<br>{measure} : %{{x:,.0f}}<br>{other} : %{{customdata:,.0f}}<extra></extra>'
+    )], height=max(320, 24 * len(ranking) + 80))
+
+
+# Distribution des délais de livraison par mode d'expédition, en part des commandes du mode
+# (les modes de volumes différents restent comparables) ; les délais vides en fin d'axe sont omis
+def build_delivery_histogram(delivery_days):
+    counts = delivery_days[DELIVERY_COLUMNS].to_numpy(dtype=np.float64)
+    used = np.flatnonzero(counts.sum(axis=0))
+    last = int(used[-1]) + 1 if len(used) else 1
+    labels = [str(day) for day in range(last)]
+    if last == MAX_DELIVERY_DAYS + 1:
+        labels[-1] = f'{MAX_DELIVERY_DAYS}+'
+    colors = SKELETONS['delivery_histogram']['colors']
+
+    traces = []
+    for i, (mode, row) in enumerate(zip(delivery_days['Mode Expédition'], counts)):
+        total = row.sum()
+        if total <= 0:
+            continue
+        traces.append(dict(
+            x=labels,
+            y=compact(row[:last] / total * 100),
+            name=str(mode),
+            marker=dict(color=colors[i % len(colors)]),
+            hovertemplate='%{x} j : %{y:.1f} %<extra>' + str(mode) + '</extra>'
+        ))
+    return from_skeleton('delivery_histogram', traces)
+
+
+# Courbe continue au pas du jour ou de la semaine, rendue en WebGL (Scattergl)
+# La série est déjà réduite au budget de points par timeseries.downsample
+def build_timeline_chart(series, measure, color):
+    return from_skeleton('timeline', [dict(
+        x=epoch_ms(series['Date']),
+        y=compact(series[measure]),
+        name=measure,
+        line=dict(color=color)
+    )])
+
+
+# Graphiques construits à partir d'une table de backend.tables : identifiant -> (table, constructeur)
+TABLE_CHARTS = {
+    'region_pie': ('region_sales', build_region_pie),
+    'segment_pie': ('segment_sales', build_segment_pie),
+    'payment_pie': ('payment_sales', build_payment_pie),
+    'monthly_sales_chart': ('monthly_sales', build_monthly_sales_chart),
+    'ship_mode_bar': ('ship_mode_sales', build_ship_mode_bar),
+    'monthly_profit_chart': ('monthly_profit', build_monthly_profit_chart),
+    'subcat_bar': ('subcat_sales', build_subcat_bar),
+    'delivery_histogram': ('delivery_days', build_delivery_histogram),
+}
+
+# Courbes jour / semaine : identifiant -> (mesure, couleur) ; la granularité complète l'identifiant
+TIMELINE_CHARTS = {
+    'sales_timeline': ('Ventes', '#74b9ff'),
+    'profit_timeline': ('Profit', '#f39c12'),
+}
+
+# Tables des métriques principales, dans l'ordre d'affichage du calcul
+KPI_TABLES = ('total_sales', 'total_profit', 'total_quantity')
+
+
+# Métriques principales : totaux, puis délai moyen et quantiles p50 / p90 / p99 des délais de
+# livraison lus sur leurs histogrammes ; table(nom) renvoie une table de backend.tables
+def kpi_values(table):
+    return tuple(float(table(name)) for name in KPI_TABLES) + delivery_summary(table('delivery_days'))
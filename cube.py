@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import Grouping
+from delivery import DELIVERY_BINS, DELIVERY_COLUMN, DELIVERY_COLUMNS, DELIVERY_TOTAL, delivery_bins, delivery_totals
+from schema import concat_frames
+
+# Dimensions du cube : une ligne par combinaison observée
+CUBE_DIMENSIONS = ['Région', 'Segment', 'Mode Paiement', 'Mode Expédition', 'Catégorie', 'Sous-Catégorie',
+                   'Année', 'Mois']
+
+# Mesures additives : sommes, plus le nombre de commandes pour les moyennes
+CUBE_MEASURES = ['Ventes', 'Profit', 'Quantité', 'Commandes']
+
+
+# Histogrammes des délais de livraison accolés aux lignes du cube (une colonne par délai), puis
+# la somme exacte des délais pour le délai moyen
+def with_histograms(cube, counts, totals):
+    histograms = pd.DataFrame(counts.astype(np.int32), columns=DELIVERY_COLUMNS, index=cube.index)
+    histograms[DELIVERY_TOTAL] = np.asarray(totals, dtype=np.float64)
+    return pd.concat([cube, histograms], axis=1)
+
+
+# Agrégation des commandes au grain du cube, en une passe sur les codes des dimensions
+# Chaque ligne porte aussi l'histogramme des délais de ses commandes : les histogrammes
+# s'additionnent, les quantiles de toute sélection se lisent donc sur le cube
+def build_cube(df):
+    grouping = Grouping(df, CUBE_DIMENSIONS)
+    cube = grouping.key_frame()
+    for measure in CUBE_MEASURES[:-1]:
+        cube[measure] = grouping.sum(measure)
+    cube['Commandes'] = grouping.count()
+    days = df[DELIVERY_COLUMN].to_numpy()
+    return with_histograms(cube, grouping.histogram(delivery_bins(days), DELIVERY_BINS),
+                           delivery_totals(grouping, days))
+
+
+# Fusion de cubes (par exemple cube existant + cube d'un lot de nouvelles commandes)
+def merge_cubes(cubes):
+    grouping = Grouping(concat_frames(cubes), CUBE_DIMENSIONS)
+    cube = grouping.key_frame()
+    for measure in CUBE_MEASURES:
+        cube[measure] = grouping.sum(measure)
+    return with_histograms(cube, np.column_stack([grouping.sum(column) for column in DELIVERY_COLUMNS]),
+                           grouping.sum(DELIVERY_TOTAL))
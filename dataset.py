@@ -0,0 +1,188 @@
+import copy
+import threading
+
+import numpy as np
+
+from aggregation import present_values
+from bitmap import BitmapIndex
+from cube import build_cube, merge_cubes
+from parallel import build_aggregates_parallel, use_parallel
+from partition import PartitionIndex, sort_by
+from periods import split_months
+from ranking import RANKING_SCOPE, RankingIndex, rank_orders
+from schema import concat_frames
+from timeseries import build_daily, merge_daily
+
+# Dimension de tri principale : ses valeurs occupent des plages contiguës du jeu et du cube
+PRIMARY_PARTITION = 'Région'
+
+# Dans chaque plage de région, les commandes sont triées par date : une période s'y résout par
+# recherche binaire
+DATE_COLUMN = 'Date Commande'
+
+# Colonnes des filtres à choix multiples (toutes sont des dimensions du cube)
+FILTER_COLUMNS = ['Segment', 'Catégorie', 'Sous-Catégorie', 'Mode Expédition', 'Mode Paiement', 'Année']
+
+
+# Ordre de stockage des commandes : par région, puis par date de commande
+def sort_dataset(frame):
+    return sort_by(frame, PRIMARY_PARTITION, then=DATE_COLUMN)
+
+
+# Commandes retenues par des filtres à choix multiples (petits sous-ensembles : bornes de période)
+def match_filters(frame, filters):
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= frame[column].isin(values).to_numpy()
+    return frame if mask.all() else frame[mask]
+
+
+# Jeu de données chargé et structures dérivées, construites une fois au chargement
+class Dataset:
+    def __init__(self, frame, version):
+        self._frame = sort_dataset(frame)
+        self._pending = []
+        self._lock = threading.Lock()
+        self.base_version = version
+        self.revision = 0
+        # Gros volumes : cube et agrégat journalier calculés par année dans un pool de processus
+        aggregates = build_aggregates_parallel(self._frame) if use_parallel(self._frame) else None
+        if aggregates is None:
+            aggregates = build_cube(self._frame), build_daily(self._frame)
+        self.cube, self.daily = aggregates
+        self._partitions = {}
+        self._bitmaps = {'cube': BitmapIndex(self.cube, [PRIMARY_PARTITION] + FILTER_COLUMNS)}
+        self._rankings = {}
+
+    # Version du jeu : change à chaque lot ajouté, pour invalider les caches dépendants
+    @property
+    def version(self):
+        if self.revision == 0:
+            return self.base_version
+        return f'{self.base_version}+{self.revision}'
+
+    # Commandes détaillées ; les lots ajoutés n'y sont fusionnés (et retriés) qu'à la première lecture
+    @property
+    def frame(self):
+        with self._lock:
+            if self._pending:
+                self._frame = sort_dataset(concat_frames([self._frame] + self._pending))
+                self._pending = []
+            return self._frame
+
+    # Nouvelle version du jeu avec un lot de commandes normalisées en plus
+    # Seul le cube est mis à jour immédiatement : on agrège le lot puis on le fusionne au cube
+    def append(self, delta):
+        if not len(delta):
+            return self
+        with self._lock:
+            appended = copy.copy(self)
+            appended._pending = self._pending + [delta]
+        appended._lock = threading.Lock()
+        appended.revision = self.revision + 1
+        appended.cube = merge_cubes([self.cube, build_cube(delta)])
+        appended.daily = merge_daily([self.daily, build_daily(delta)])
+        appended._partitions = {}
+        appended._bitmaps = {'cube': BitmapIndex(appended.cube, [PRIMARY_PARTITION] + FILTER_COLUMNS)}
+        appended._rankings = {}
+        return appended
+
+    # Valeurs présentes d'une dimension du cube, dans l'ordre des catégories (ordre croissant
+    # pour les colonnes non catégorielles)
+    def values(self, column):
+        return present_values(self.cube[column])
+
+    # Index de partition d'une colonne, construit à la première demande
+    # target='cube' pour les lignes du cube, 'daily' pour l'agrégat journalier,
+    # 'frame' pour les commandes détaillées
+    def partition(self, column, target='cube'):
+        key = (column, target)
+        if key not in self._partitions:
+            self._partitions[key] = PartitionIndex(getattr(self, target), column)
+        return self._partitions[key]
+
+    # Lignes correspondant à une valeur de filtre ('Toutes' pour ne pas filtrer)
+    def filter(self, column, value, target='cube'):
+        table = getattr(self, target)
+        if value == 'Toutes':
+            return table
+        return self.partition(column, target).select(table, value)
+
+    # Lignes du cube correspondant au filtre région
+    def select(self, region='Toutes'):
+        return self.filter(PRIMARY_PARTITION, region)
+
+    # Index bitmap des colonnes filtrables : construit au chargement pour le cube, à la première
+    # demande pour les commandes détaillées (vues jour / semaine filtrées)
+    def bitmaps(self, target='cube'):
+        if target not in self._bitmaps:
+            self._bitmaps[target] = BitmapIndex(getattr(self, target), [PRIMARY_PARTITION] + FILTER_COLUMNS)
+        return self._bitmaps[target]
+
+    # Lignes d'une combinaison de filtres : région seule par plage contiguë, sinon par bitmaps
+    # filters : {colonne: valeurs retenues} ; une liste vide ne filtre pas
+    def query(self, region='Toutes', filters=None, target='cube'):
+        filters = {column: values for column, values in (filters or {}).items() if values}
+        if not filters:
+            return self.filter(PRIMARY_PARTITION, region, target)
+        if region != 'Toutes':
+            filters[PRIMARY_PARTITION] = [region]
+        return getattr(self, target).iloc[self.bitmaps(target).rows(filters)]
+
+    # Commandes passées entre deux jours inclus, pour une région ou toutes : recherche binaire sur
+    # les dates dans la plage de chaque région
+    def orders_between(self, region, start, end):
+        frame = self.frame
+        index = self.partition(PRIMARY_PARTITION, 'frame')
+        dates = frame[DATE_COLUMN].to_numpy()
+        bounds = np.array([start, end + 1], dtype='datetime64[D]').astype(dates.dtype)
+        positions = []
+        for value in (index.values if region == 'Toutes' else [region]):
+            rows = index.rows(value)
+            low, high = rows.start + np.searchsorted(dates[rows], bounds)
+            positions.append(np.arange(low, high))
+        return frame.iloc[np.concatenate(positions)]
+
+    # Lignes au grain du cube pour une période (jours inclus) : les mois entiers sont lus dans le
+    # cube, les jours des mois entamés aux bornes sont agrégés depuis les commandes
+    def period(self, region, filters, start, end):
+        months, edges = split_months(start, end)
+        parts = []
+        if months is not None:
+            cube = self.query(region, filters)
+            keys = cube['Année'].to_numpy(np.int64) * 12 + cube['Mois'].to_numpy(np.int64) - 1
+            parts.append(cube[(keys >= months[0]) & (keys <= months[1])])
+        for low, high in edges:
+            parts.append(build_cube(match_filters(self.orders_between(region, low, high), filters)))
+        return parts[0] if len(parts) == 1 else concat_frames(parts)
+
+    # Index de classement d'une colonne de détail (produits, clients), construit à la première demande
+    def ranking_index(self, column):
+        if column not in self._rankings:
+            self._rankings[column] = RankingIndex(self.frame, column)
+        return self._rankings[column]
+
+    # k premières valeurs d'une colonne de détail selon une mesure : sommes pré-calculées pour un
+    # périmètre région / sous-catégories, commandes sélectionnées pour les autres filtres et la période
+    def top(self, column, measure, k, region='Toutes', filters=None, dates=None):
+        filters = {c: values for c, values in (filters or {}).items() if values}
+        if dates is None and set(filters) <= set(RANKING_SCOPE):
+            return self.ranking_index(column).top(measure, k, region, filters)
+        if dates is None:
+            orders = self.query(region, filters, target='frame')
+        else:
+            orders = match_filters(self.orders_between(region, *dates), filters)
+        return rank_orders(orders, column, measure, k)
+
+    # Agrégat journalier d'une sélection, éventuellement restreint à une période (jours inclus)
+    def daily_between(self, region, filters, dates=None):
+        if any((filters or {}).values()):
+            daily = build_daily(self.query(region, filters, target='frame'))
+        else:
+            daily = self.filter(PRIMARY_PARTITION, region, target='daily')
+        if dates is None:
+            return daily
+        days = daily['Jour'].to_numpy()
+        start, end = (np.datetime64(d, 'D').astype(np.int64) for d in dates)
+        return daily[(days >= start) & (days <= end)]
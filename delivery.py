@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Délais de livraison comptés en jours entiers ; le dernier compartiment regroupe les délais plus longs
+MAX_DELIVERY_DAYS = 30
+DELIVERY_BINS = MAX_DELIVERY_DAYS + 1
+DELIVERY_COLUMN = 'Délai Livraison'
+
+# Colonnes des histogrammes stockés dans le cube : nombre de commandes par délai
+DELIVERY_COLUMNS = [f'{DELIVERY_COLUMN}:{day}' for day in range(DELIVERY_BINS)]
+
+# Somme exacte des délais connus, à côté des histogrammes : le délai moyen ne dépend pas du plafond
+DELIVERY_TOTAL = f'{DELIVERY_COLUMN}:total'
+
+DELIVERY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+# Délai en jours entre commande et expédition, calculé d'un bloc sur les dates ; -1 si une des
+# dates manque, 0 si l'expédition précède la commande (erreur de saisie)
+def delivery_days(order_dates, ship_dates):
+    order = np.asarray(order_dates, dtype='datetime64[ns]').astype('datetime64[D]')
+    ship = np.asarray(ship_dates, dtype='datetime64[ns]').astype('datetime64[D]')
+    days = np.clip((ship - order).astype(np.int64), 0, np.iinfo(np.int16).max)
+    return np.where(np.isnat(order) | np.isnat(ship), -1, days).astype(np.int16)
+
+
+# Compartiment de chaque délai (délais inconnus : -1, ignorés par les histogrammes)
+def delivery_bins(days):
+    return np.minimum(np.asarray(days, dtype=np.int64), MAX_DELIVERY_DAYS)
+
+
+# Somme des délais connus par groupe : un histogramme à un seul compartiment (code 0 pour un délai
+# connu, -1 sinon) pondéré par les délais
+def delivery_totals(grouping, days, weights=None):
+    days = np.asarray(days, dtype=np.int64)
+    values = days.astype(np.float64) if weights is None else days * weights
+    return grouping.histogram(np.minimum(days, 0), 1, values)[:, 0]
+
+
+# Histogrammes des délais par groupe : sommes des histogrammes du cube, ou comptage direct des
+# délais des commandes (pondérées par count_column, par exemple pour un échantillon)
+# Les histogrammes s'additionnent : toute sélection se résout sans relire ni trier les délais
+def histogram_table(grouping, frame, count_column=None):
+    if DELIVERY_COLUMNS[0] in frame.columns:
+        counts = np.column_stack([grouping.sum(column) for column in DELIVERY_COLUMNS])
+        totals = grouping.sum(DELIVERY_TOTAL)
+    else:
+        weights = frame[count_column].to_numpy(dtype=np.float64) if count_column else None
+        days = frame[DELIVERY_COLUMN].to_numpy()
+        counts = grouping.histogram(delivery_bins(days), DELIVERY_BINS, weights)
+        totals = delivery_totals(grouping, days, weights)
+    table = pd.concat([grouping.key_frame(), pd.DataFrame(counts, columns=DELIVERY_COLUMNS)], axis=1)
+    table[DELIVERY_TOTAL] = totals
+    return table
+
+
+# Quantile d'un histogramme (rang le plus proche) : plus petit délai couvrant la part q des commandes
+def quantile(counts, q):
+    cumulative = np.cumsum(counts)
+    if not len(cumulative) or cumulative[-1] <= 0:
+        return float('nan')
+    return float(np.searchsorted(cumulative, q * cumulative[-1] * (1 - 1e-12), side='left'))
+
+
+# Délai moyen exact (somme des délais / commandes), puis quantiles lus sur les histogrammes,
+# toutes lignes d'une table confondues ; un quantile égal à MAX_DELIVERY_DAYS tombe dans le
+# dernier compartiment et n'est qu'une borne inférieure
+def delivery_summary(table):
+    counts = table[DELIVERY_COLUMNS].to_numpy(dtype=np.float64).sum(axis=0)
+    total = counts.sum()
+    mean = float(table[DELIVERY_TOTAL].sum() / total) if total > 0 else float('nan')
+    return (mean,) + tuple(quantile(counts, q) for q in DELIVERY_QUANTILES)
+
+
+# Délai en jours entiers, ou tiret sans date d'expédition connue
+def format_days(value):
+    return '–' if np.isnan(value) else f'{value:.0f} j'
+
+
+# Quantile en jours entiers, « ≥ » quand il tombe dans le dernier compartiment
+def format_quantile(value):
+    if not np.isnan(value) and value >= MAX_DELIVERY_DAYS:
+        return f'≥ {MAX_DELIVERY_DAYS} j'
+    return format_days(value)
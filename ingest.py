@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from schema import concat_frames, normalize
+
+logger = logging.getLogger('tableau_de_bord.ingest')
+
+# Nombre de lignes Excel converties à la fois par la lecture en flux
+EXCEL_CHUNK_ROWS = 50_000
+
+# Intervalle (secondes) entre deux relevés de la surveillance en arrière-plan
+DEFAULT_WATCH_INTERVAL = 2.0
+
+
+# Lecture en flux d'une feuille Excel : les lignes sont lues par blocs (openpyxl en lecture seule)
+# et chaque bloc est aussitôt normalisé, pour ne jamais garder toute la feuille en objets Python
+def iter_excel_chunks(path, chunk_rows=EXCEL_CHUNK_ROWS, sheet_name=None):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield normalize(pd.DataFrame(chunk, columns=columns))
+                chunk = []
+        if chunk:
+            yield normalize(pd.DataFrame(chunk, columns=columns))
+    finally:
+        workbook.close()
+
+
+# Feuille Excel complète au schéma compact, assemblée bloc par bloc
+def read_excel_compact(path, chunk_rows=EXCEL_CHUNK_ROWS, sheet_name=None):
+    chunks = list(iter_excel_chunks(path, chunk_rows, sheet_name))
+    if not chunks:
+        raise ValueError(f"Feuille vide : {path}")
+    return concat_frames(chunks)
+
+
+# Formats acceptés pour les lots de nouvelles commandes (lecteurs qui renvoient le schéma normalisé)
+DELTA_READERS = {
+    '.csv': lambda path: normalize(pd.read_csv(path)),
+    '.parquet': lambda path: normalize(pd.read_parquet(path)),
+    '.xlsx': read_excel_compact,
+}
+
+
+# Lecture d'un lot de nouvelles commandes, ramené au schéma du tableau de bord
+def read_delta(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in DELTA_READERS:
+        raise ValueError(f"Format de lot non pris en charge : {path}")
+    return DELTA_READERS[extension](path)
+
+
+# Fichiers de lots d'un répertoire, par ordre de nom
+# Les lots doivent y être déposés de façon atomique (écriture puis renommage)
+def list_deltas(directory):
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in DELTA_READERS
+    )
+
+
+# Version courante du jeu de données, enrichie au fil des lots déposés dans un répertoire
+class DatasetStore:
+    def __init__(self, dataset, delta_dir=None):
+        self.delta_dir = delta_dir
+        self._dataset = dataset
+        self._applied = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def dataset(self):
+        return self._dataset
+
+    # Ajoute un lot déjà chargé et publie la nouvelle version
+    def append(self, delta):
+        with self._lock:
+            self._dataset = self._dataset.append(delta)
+            return self._dataset
+
+    # Lots du répertoire ajoutés à un jeu, leurs noms à `applied` ; un lot illisible est journalisé
+    # puis écarté, et mémorisé pour n'être relu ni à chaque réexécution ni à chaque relevé
+    def _append_deltas(self, dataset, names, applied):
+        for name in names:
+            if name in applied or name in self._failed:
+                continue
+            try:
+                dataset = dataset.append(read_delta(os.path.join(self.delta_dir, name)))
+            except Exception:
+                logger.exception("Lot ignoré : %s", name)
+                self._failed.add(name)
+                continue
+            applied.add(name)
+        return dataset
+
+    # Intègre les lots du répertoire qui n'ont pas encore été appliqués
+    # Un lot modifié après coup est ignoré : déposer plutôt un nouveau fichier
+    def refresh(self):
+        pending = [name for name in list_deltas(self.delta_dir)
+                   if name not in self._applied and name not in self._failed]
+        if not pending:
+            return self._dataset
+        with self._lock:
+            self._dataset = self._append_deltas(self._dataset, pending, self._applied)
+            return self._dataset
+
+    @property
+    def watching(self):
+        return self._watcher is not None
+
+    # Jeu à servir pour une réexécution : celui publié par la surveillance si elle est active (aucune
+    # lecture sur le chemin de la requête), sinon après intégration des lots en attente
+    # Une session garde le jeu obtenu pour toute sa réexécution, même si un nouveau est publié entre-temps
+    def current(self):
+        return self._dataset if self.watching else self.refresh()
+
+    # Surveillance en arrière-plan : à chaque relevé, intègre les lots déposés et, si la version de la
+    # source a changé, recharge le jeu complet hors des requêtes puis le publie d'un bloc
+    # version() renvoie la version courante de la source, load() un Dataset neuf
+    def watch(self, version, load, interval=DEFAULT_WATCH_INTERVAL):
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, args=(version, load, interval),
+                                                 name='surveillance-source', daemon=True)
+                self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self, version, load, interval):
+        seen = failed = None
+        while not self._stop.wait(interval):
+            try:
+                current = version()
+                # Version stable sur deux relevés : on ne lit pas un fichier en cours d'écriture
+                # Une version illisible n'est pas relue avant d'avoir changé
+                if current != self._dataset.base_version and current == seen and current != failed:
+                    try:
+                        self._reload(version, load)
+                    except Exception:  # source illisible : le jeu publié reste servi
+                        failed = current
+                        raise
+                seen = current
+                self.refresh()
+            except Exception:
+                logger.exception("Échec du rechargement en arrière-plan")
+
+    # Nouveau jeu construit à part (cube, agrégats, lots du répertoire), puis échangé sous verrou :
+    # les réexécutions en cours gardent l'ancien, les suivantes obtiennent le nouveau
+    def _reload(self, version, load):
+        dataset = load()
+        if dataset.base_version != version():
+            return  # source modifiée pendant le chargement : nouvel essai au relevé suivant
+        applied = set()
+        dataset = self._append_deltas(dataset, list_deltas(self.delta_dir), applied)
+        with self._lock:
+            self._dataset = dataset
+            self._applied = applied
+        logger.info("Jeu rechargé : version %s", dataset.version)
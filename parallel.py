@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from aggregation import MAX_DENSE_GROUPS, Grouping, column_codes, decode_keys
+from cube import CUBE_DIMENSIONS, CUBE_MEASURES, with_histograms
+from delivery import DELIVERY_BINS, DELIVERY_COLUMN, delivery_bins
+from timeseries import SERIES_MEASURES
+
+# Seuil (en commandes) à partir duquel les agrégats sont calculés en parallèle
+PARALLEL_MIN_ROWS = int(os.environ.get('DASHBOARD_PARALLEL_ROWS', 2_000_000))
+
+# Nombre de processus ; 0 ou 1 désactive le mode parallèle
+PARALLEL_WORKERS = int(os.environ.get('DASHBOARD_PARALLEL_WORKERS', os.cpu_count() or 1))
+
+PARTITION_COLUMN = 'Année'
+
+
+# Le mode parallèle ne s'active qu'au-delà du seuil et avec plusieurs processus disponibles
+def use_parallel(frame, workers=None):
+    workers = PARALLEL_WORKERS if workers is None else workers
+    return workers > 1 and len(frame) >= PARALLEL_MIN_ROWS
+
+
+# Plus petit type entier signé capable de coder `size` valeurs (et -1 pour les manquantes)
+def _code_dtype(size):
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+# Tableaux numpy copiés en mémoire partagée : les processus y accèdent sans recopie ni pickle
+class SharedArrays:
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+# Côté processus de calcul : rattachement aux blocs partagés
+def _attach(spec):
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in spec.items():
+        # Les processus lancés par 'spawn' partagent le suivi des ressources du processus principal,
+        # qui reste seul responsable de la destruction des blocs
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+# Sommes partielles d'un groupe de clés sur les lignes d'une partition (et, pour le cube,
+# histogrammes et sommes des délais de livraison)
+# Les lignes sont parcourues dans l'ordre d'origine : chaque somme est identique bit à bit au calcul série
+def _partial_sums(arrays, rows, keys, sizes, measures, histogram=False):
+    codes = [arrays[f'code:{key}'][rows] for key in keys]
+    valid = np.logical_and.reduce([c >= 0 for c in codes])
+    if not valid.all():
+        rows = rows[valid]
+        codes = [c[valid] for c in codes]
+    ids = np.ravel_multi_index(codes, sizes)
+    present, inverse = np.unique(ids, return_inverse=True)
+    sums = {measure: np.bincount(inverse, weights=arrays[measure][rows].astype(np.float64),
+                                 minlength=len(present))
+            for measure in measures}
+    counts = np.bincount(inverse, minlength=len(present))
+    if not histogram:
+        return present, sums, counts, None, None
+    days = arrays[DELIVERY_COLUMN][rows]
+    keep = days >= 0
+    days, inverse = days[keep], inverse[keep]
+    histograms = np.bincount(inverse * DELIVERY_BINS + delivery_bins(days), minlength=len(present) * DELIVERY_BINS)
+    totals = np.bincount(inverse, weights=days.astype(np.float64), minlength=len(present))
+    return present, sums, counts, histograms.reshape(len(present), DELIVERY_BINS), totals
+
+
+# Tâche d'un processus : cube et agrégat journalier d'une partition (une année)
+def _aggregate_partition(spec, start, stop, cube_sizes, daily_sizes):
+    blocks, arrays = _attach(spec)
+    try:
+        rows = arrays['order'][start:stop]
+        cube = _partial_sums(arrays, rows, CUBE_DIMENSIONS, cube_sizes, CUBE_MEASURES[:-1], histogram=True)
+        daily = _partial_sums(arrays, rows, ['Région:daily', 'Jour'], daily_sizes, SERIES_MEASURES)
+        return cube, daily
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+# Assemblage des partiels : chaque groupe n'appartient qu'à une partition, donc simple concaténation
+def _merge(partials, keys, sizes, uniques, measures, dtypes, count_column=None):
+    ids = np.concatenate([p[0] for p in partials])
+    order = np.argsort(ids, kind='stable')
+    table = decode_keys(keys, np.unravel_index(ids[order], sizes), uniques)
+    for measure in measures:
+        totals = np.concatenate([p[1][measure] for p in partials])[order]
+        table[measure] = Grouping.cast_sums(totals, dtypes[measure])
+    if count_column:
+        table[count_column] = np.concatenate([p[2] for p in partials])[order].astype(np.int64)
+    if partials[0][3] is not None:
+        table = with_histograms(table, np.concatenate([p[3] for p in partials])[order],
+                                np.concatenate([p[4] for p in partials])[order])
+    return table
+
+
+# Cube et agrégat journalier calculés par partition d'années dans un pool de processus
+# Renvoie None si les clés sont trop nombreuses pour le codage dense (le calcul série s'applique)
+def build_aggregates_parallel(frame, workers=None):
+    workers = PARALLEL_WORKERS if workers is None else workers
+    days = pd.Series(frame['Date Commande'].to_numpy().astype('datetime64[D]').astype(np.int64))
+
+    arrays, uniques, sizes = {}, {}, {}
+    for key in CUBE_DIMENSIONS:
+        codes, values, is_cat = column_codes(frame[key])
+        uniques[key], sizes[key] = (values, is_cat), max(len(values), 1)
+        arrays[f'code:{key}'] = codes.astype(_code_dtype(sizes[key]))
+    # L'agrégat journalier (comme build_daily) range les régions par ordre alphabétique, hors catégories
+    codes, values, is_cat = column_codes(frame['Région'])
+    if is_cat:
+        order = np.argsort(np.asarray(values))
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+        codes = np.where(codes >= 0, rank[np.maximum(codes, 0)], -1)
+        values = values[order]
+    uniques['Région:daily'] = (pd.Index(np.asarray(values, dtype=object)), False)
+    arrays['code:Région:daily'] = codes.astype(arrays['code:Région'].dtype)
+    codes, values, _ = column_codes(days)
+    uniques['Jour'], sizes['Jour'] = (values, False), max(len(values), 1)
+    arrays['code:Jour'] = codes.astype(_code_dtype(sizes['Jour']))
+
+    cube_sizes = tuple(sizes[key] for key in CUBE_DIMENSIONS)
+    daily_sizes = (sizes['Région'], sizes['Jour'])
+    if np.prod(cube_sizes, dtype=np.float64) > MAX_DENSE_GROUPS:
+        return None
+
+    measures = list(dict.fromkeys(CUBE_MEASURES[:-1] + SERIES_MEASURES))
+    for measure in measures:
+        arrays[measure] = frame[measure].to_numpy()
+    arrays[DELIVERY_COLUMN] = frame[DELIVERY_COLUMN].to_numpy()
+
+    # Partitions : positions des lignes triées par année (tri stable, l'ordre d'origine est conservé)
+    partition_codes = arrays[f'code:{PARTITION_COLUMN}']
+    arrays['order'] = np.argsort(partition_codes, kind='stable')
+    # Les lignes sans année (code -1) sont en tête et ne forment aucune tâche
+    bounds = np.cumsum(np.bincount(partition_codes.astype(np.int64) + 1))
+    tasks = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+    if not tasks:
+        return None
+
+    shared = SharedArrays(arrays)
+    try:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)) or 1, mp_context=context) as pool:
+            futures = [pool.submit(_aggregate_partition, shared.spec, start, stop, cube_sizes, daily_sizes)
+                       for start, stop in tasks]
+            partials = [future.result() for future in futures]
+    except (BrokenProcessPool, OSError):  # pool impossible à démarrer (bac à sable, limites) : calcul série
+        return None
+    finally:
+        shared.close()
+
+    dtypes = {measure: frame[measure].dtype for measure in measures}
+    cube = _merge([p[0] for p in partials], CUBE_DIMENSIONS, cube_sizes,
+                  [uniques[key] for key in CUBE_DIMENSIONS], CUBE_MEASURES[:-1], dtypes, 'Commandes')
+    daily = _merge([p[1] for p in partials], ['Région', 'Jour'], daily_sizes,
+                   [uniques['Région:daily'], uniques['Jour']], SERIES_MEASURES, dtypes)
+    return cube, daily
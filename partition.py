@@ -0,0 +1,53 @@
+import numpy as np
+
+from aggregation import column_codes
+
+
+# Tri stable d'un jeu de données selon une colonne, pour que chaque valeur occupe une plage contiguë
+# `then` : seconde colonne triée à l'intérieur de chaque plage (recherche binaire possible par plage)
+def sort_by(frame, column, then=None):
+    codes, _, _ = column_codes(frame[column])
+    if len(codes) < 2:
+        return frame
+    ordered = codes[:-1] <= codes[1:]
+    if then is None:
+        if ordered.all():
+            return frame
+        order = np.argsort(codes, kind='stable')
+    else:
+        second = frame[then].to_numpy()
+        if (ordered & ((codes[:-1] < codes[1:]) | (second[:-1] <= second[1:]))).all():
+            return frame
+        order = np.lexsort((second, codes))
+    return frame.take(order).reset_index(drop=True)
+
+
+# Index de partition : valeur du filtre -> plage de lignes contiguë (colonne triée)
+# ou tableau de positions stocké (colonne non triée)
+class PartitionIndex:
+    def __init__(self, frame, column):
+        self.column = column
+        codes, uniques, _ = column_codes(frame[column])
+        self.values = list(uniques)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+
+        self.contiguous = len(codes) < 2 or (codes[:-1] <= codes[1:]).all()
+        if self.contiguous:
+            # Les codes manquants (-1) sont en tête après un tri : on décale les bornes
+            offset = int((codes < 0).sum())
+            self._ranges = {value: slice(offset + int(bounds[i]), offset + int(bounds[i + 1]))
+                            for i, value in enumerate(self.values) if counts[i]}
+        else:
+            order = np.argsort(codes, kind='stable')
+            order = order[int((codes < 0).sum()):]
+            self._ranges = {value: order[bounds[i]:bounds[i + 1]]
+                            for i, value in enumerate(self.values) if counts[i]}
+
+    # Plage (slice) ou positions des lignes d'une valeur ; vide si la valeur est absente
+    def rows(self, value):
+        return self._ranges.get(value, slice(0, 0))
+
+    # Lignes d'une valeur : tranche sans copie si la colonne est triée
+    def select(self, frame, value):
+        return frame.iloc[self.rows(value)]
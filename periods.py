@@ -0,0 +1,47 @@
+import numpy as np
+
+# Préréglages du filtre de période ; les périodes glissantes se terminent au dernier jour de données
+PERIOD_PRESETS = ['Tout', '30 derniers jours', '90 derniers jours', '365 derniers jours',
+                  'Depuis le 1er janvier', 'Personnalisée']
+ROLLING_DAYS = {'30 derniers jours': 30, '90 derniers jours': 90, '365 derniers jours': 365}
+
+# Les mois sont numérotés année * 12 + mois - 1, comme les colonnes Année et Mois du cube
+EPOCH_MONTH = 1970 * 12
+
+
+def to_day(value):
+    return np.datetime64(value, 'D')
+
+
+# Période (premier jour, dernier jour inclus) d'un préréglage, bornée aux données ; None pour 'Tout'
+def preset_range(preset, first, last):
+    first, last = to_day(first), to_day(last)
+    if preset in ROLLING_DAYS:
+        return max(first, last - ROLLING_DAYS[preset] + 1), last
+    if preset == 'Depuis le 1er janvier':
+        return max(first, last.astype('datetime64[Y]').astype('datetime64[D]')), last
+    return None
+
+
+def month_index(day):
+    return int(to_day(day).astype('datetime64[M]').astype(np.int64)) + EPOCH_MONTH
+
+
+def month_start(index):
+    return np.datetime64(index - EPOCH_MONTH, 'M').astype('datetime64[D]')
+
+
+# Découpage d'une période en mois entiers (premier, dernier ; None s'il n'y en a pas) et en plages
+# de jours des mois entamés aux bornes
+def split_months(start, end):
+    start, end = to_day(start), to_day(end)
+    first = month_index(start - 1) + 1
+    last = month_index(end + 1) - 1
+    if first > last:
+        return None, [(start, end)]
+    edges = []
+    if start < month_start(first):
+        edges.append((start, month_start(first) - 1))
+    if end >= month_start(last + 1):
+        edges.append((month_start(last + 1), end))
+    return (first, last), edges
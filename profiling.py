@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger('tableau_de_bord.profiling')
+
+# Modes acceptés par DASHBOARD_PROFILE ou le paramètre d'URL ?profile=
+# 1 : chronométrage des sections ; cprofile / pyinstrument : capture complète d'une réexécution
+PROFILE_MODES = ('1', 'cprofile', 'pyinstrument')
+PROFILE_DIR = 'profiles'
+
+# Le paramètre d'URL n'est suivi qu'avec DASHBOARD_PROFILE_QUERY=1 : sinon n'importe quel visiteur
+# déclencherait des captures
+QUERY_ENABLED = os.environ.get('DASHBOARD_PROFILE_QUERY', '0') == '1'
+
+# Profils complets conservés dans PROFILE_DIR : au-delà, les plus anciens sont supprimés
+MAX_PROFILE_FILES = int(os.environ.get('DASHBOARD_PROFILE_MAX_FILES', 20))
+
+
+# Mode de profilage demandé, ou None si désactivé
+def profile_mode(query_value=None):
+    if not QUERY_ENABLED:
+        query_value = None
+    value = (query_value or os.environ.get('DASHBOARD_PROFILE', '')).strip().lower()
+    if value in ('true', 'yes', 'on'):
+        value = '1'
+    return value if value in PROFILE_MODES else None
+
+
+# Ne garde que les `keep` profils les plus récents de PROFILE_DIR
+def _rotate(keep=MAX_PROFILE_FILES):
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if name.startswith('rerun-')]
+        paths = sorted((os.path.join(PROFILE_DIR, name) for name in names), key=os.path.getmtime)
+    except OSError:
+        return
+    for path in paths[:max(len(paths) - keep, 0)]:
+        try:
+            os.remove(path)
+        except OSError:  # déjà supprimé par une autre session
+            pass
+
+
+def _setup_logger():
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+# Chronométrage des sections nommées d'une réexécution, avec lignes traitées et octets envoyés
+# Désactivé, chaque section se réduit à un gestionnaire de contexte vide
+class Profiler:
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.enabled = mode is not None
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._depth = 0
+        self._start = time.perf_counter()
+        self._capture = None
+        self.emitted = False
+        if self.enabled:
+            _setup_logger()
+
+    # Section chronométrée ; le dictionnaire renvoyé accueille des champs libres (rows, bytes, hit…)
+    @contextmanager
+    def section(self, name, **fields):
+        if not self.enabled:
+            yield fields
+            return
+        record = {'section': name, 'depth': self._depth, **fields}
+        self._depth += 1
+        start = time.perf_counter()
+        record['start_ms'] = round((start - self._start) * 1000, 3)
+        try:
+            yield record
+        finally:
+            record['ms'] = round((time.perf_counter() - start) * 1000, 3)
+            self._depth -= 1
+            self.records.append(record)
+
+    # Démarre la capture cProfile / pyinstrument de la réexécution courante
+    def start_capture(self):
+        if self.mode == 'cprofile':
+            import cProfile
+            self._capture = cProfile.Profile()
+            try:
+                self._capture.enable()
+            except ValueError:  # un autre profileur est déjà actif (session concurrente)
+                self._capture = None
+        elif self.mode == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler as Instrument
+            except ImportError:
+                logger.warning(json.dumps({'run_id': self.run_id, 'error': "pyinstrument n'est pas installé"}))
+                return
+            self._capture = Instrument()
+            self._capture.start()
+
+    # Arrête la capture et l'écrit dans PROFILE_DIR (MAX_PROFILE_FILES au plus) ; renvoie le chemin du fichier
+    def stop_capture(self):
+        if self._capture is None:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if self.mode == 'cprofile':
+            self._capture.disable()
+            path = os.path.join(PROFILE_DIR, f'rerun-{self.run_id}.prof')
+            self._capture.dump_stats(path)
+        else:
+            self._capture.stop()
+            path = os.path.join(PROFILE_DIR, f'rerun-{self.run_id}.html')
+            with open(path, 'w') as f:
+                f.write(self._capture.output_html())
+        self._capture = None
+        _rotate()
+        return path
+
+    # Écrit une ligne JSON par section, puis le total de la réexécution
+    def emit(self, **fields):
+        self.emitted = True
+        if not self.enabled:
+            return
+        for record in self.records:
+            logger.info(json.dumps({'run_id': self.run_id, **record}, ensure_ascii=False, default=str))
+        total = round((time.perf_counter() - self._start) * 1000, 3)
+        logger.info(json.dumps({'run_id': self.run_id, 'section': 'rerun', 'ms': total, **fields},
+                               ensure_ascii=False, default=str))
+
+    # Sections dans l'ordre de début (les enregistrements sont ajoutés à la sortie de chaque section)
+    def table(self):
+        return sorted(self.records, key=lambda r: r['start_ms'])
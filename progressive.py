@@ -0,0 +1,156 @@
+import os
+import threading
+
+import numpy as np
+
+from aggregation import DASHBOARD_SPECS, aggregate, present_values
+from cache import CACHE_FORMAT, pa, read_arrow, read_key, write_arrow
+from cube import CUBE_MEASURES, build_cube
+from sampling import DEFAULT_SAMPLE_ROWS, stratified_sample, total_margin
+from sources import dataset_version, open_store
+from timeseries import build_daily, resample
+
+# Mesures dont les KPI affichent un intervalle de confiance
+MARGIN_MEASURES = ['Ventes', 'Profit', 'Quantité']
+
+
+# Échantillon conservé d'un lancement à l'autre, à côté des autres fichiers de cache
+def sample_path_for(source):
+    return f'echantillon-{source}.arrow'
+
+
+# Moteur approché : estimations pondérées sur l'échantillon stratifié, le temps que le jeu complet
+# se charge. Chaque mesure est multipliée par le poids de sa ligne et « Commandes » compte les poids,
+# si bien que sommes, moyennes (ratio des sommes) et histogrammes des délais sont les estimateurs du
+# jeu complet
+class SampleBackend:
+    approximate = True
+
+    def __init__(self, sample, version):
+        self.sample = sample
+        self._version = version
+        weighted = sample.drop(columns=['Strate', 'Poids'])
+        weights = sample['Poids'].to_numpy()
+        for measure in CUBE_MEASURES[:-1]:
+            weighted[measure] = sample[measure].to_numpy(dtype=np.float64) * weights
+        weighted['Commandes'] = weights
+        self.weighted = weighted
+        self.cube = build_cube(weighted)
+
+    # Version distincte de celle du jeu complet : les figures approchées n'entrent jamais en
+    # concurrence avec les figures exactes dans le cache
+    @property
+    def version(self):
+        return f'{self._version}~echantillon'
+
+    # Mêmes options, dans le même ordre, que le moteur exact
+    def values(self, column):
+        return present_values(self.cube[column])
+
+    def date_bounds(self):
+        days = self.sample['Date Commande'].to_numpy().astype('datetime64[D]')
+        return days.min(), days.max()
+
+    # Lignes de l'échantillon retenues par la région, les filtres et la période
+    def _mask(self, region, filters, dates):
+        frame = self.weighted
+        mask = np.ones(len(frame), dtype=bool)
+        if region != 'Toutes':
+            mask &= (frame['Région'] == region).to_numpy()
+        for column, values in (filters or {}).items():
+            if values:
+                mask &= frame[column].isin(values).to_numpy()
+        if dates is not None:
+            days = frame['Date Commande'].to_numpy().astype('datetime64[D]')
+            mask &= (days >= dates[0]) & (days <= dates[1])
+        return mask
+
+    def rows(self, region='Toutes', filters=None, dates=None):
+        return int(self._mask(region, filters, dates).sum())
+
+    def tables(self, region='Toutes', specs=DASHBOARD_SPECS, filters=None, dates=None):
+        rows = self.weighted[self._mask(region, filters, dates)]
+        return aggregate(rows, specs, count_column='Commandes')
+
+    def series(self, region='Toutes', granularity='Jour', filters=None, dates=None):
+        return resample(build_daily(self.weighted[self._mask(region, filters, dates)]), granularity)
+
+    # Demi-largeurs des intervalles de confiance à 95 % des totaux affichés en KPI
+    def margins(self, region='Toutes', filters=None, dates=None):
+        mask = self._mask(region, filters, dates)
+        return {measure: total_margin(self.sample, mask, measure) for measure in MARGIN_MEASURES}
+
+
+# Chargement progressif : l'échantillon du lancement précédent (s'il correspond à la version de la
+# source) est disponible tout de suite, le jeu complet se charge dans un fil d'exécution en arrière-plan
+# lancé par start() ; une fois le jeu chargé, l'échantillon est réécrit pour le prochain démarrage
+class ProgressiveLoader:
+    def __init__(self, source, delta_dir=None, sample_rows=DEFAULT_SAMPLE_ROWS, sample_path=None, watch_interval=0):
+        self.source = source
+        self.delta_dir = delta_dir
+        self.sample_rows = sample_rows
+        self.watch_interval = watch_interval
+        self.sample_path = sample_path or sample_path_for(source)
+        self.version = dataset_version(source)
+        self.key = {'version': self.version, 'rows': sample_rows, 'format': CACHE_FORMAT}
+        self.sample = self._read_sample()
+        self.store = None
+        self.error = None
+        self._backend = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _read_sample(self):
+        if pa is None or not os.path.exists(self.sample_path):
+            return None
+        try:
+            if read_key(self.sample_path) == self.key:
+                return read_arrow(self.sample_path)
+        except (OSError, pa.ArrowException, ValueError):
+            pass  # échantillon illisible : réécrit après le chargement complet
+        return None
+
+    def _load(self):
+        try:
+            self.store = open_store(self.source, self.delta_dir, self.watch_interval)
+            # Un jeu simulé de repli (fichier réel illisible) ne doit pas passer pour un échantillon réel
+            if self.sample is None and pa is not None and self.store.dataset.base_version == self.version:
+                sample = stratified_sample(self.store.dataset.frame, self.sample_rows)
+                try:
+                    write_arrow(sample, self.sample_path, self.key)
+                except (OSError, pa.ArrowException):
+                    pass  # répertoire en lecture seule : pas d'échantillon au prochain démarrage
+        except BaseException as error:
+            self.error = error
+        finally:
+            self._done.set()
+
+    # Lance le chargement complet (une seule fois). Le lancer après l'envoi de la première page évite
+    # que le fil d'exécution dispute le GIL au rendu des estimations
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name='chargement-complet', daemon=True)
+                self._thread.start()
+
+    # Jeu complet chargé (ou chargement en échec, que wait() signale)
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    # Moteur approché sur l'échantillon, ou None s'il n'y en a pas encore
+    def sample_backend(self):
+        if self.sample is None:
+            return None
+        if self._backend is None:
+            self._backend = SampleBackend(self.sample, self.version)
+        return self._backend
+
+    # Attend la fin du chargement complet et renvoie le DatasetStore
+    def wait(self, timeout=None):
+        self.start()
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.store
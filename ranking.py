@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import Grouping, column_codes
+
+# Colonnes de détail proposées au classement, et mesures classées
+RANKING_COLUMNS = ['Produit', 'Client']
+RANKING_MEASURES = ['Ventes', 'Profit']
+
+# Grain des sommes pré-calculées : les classements limités à une région et / ou des
+# sous-catégories n'ont jamais besoin des commandes détaillées
+RANKING_SCOPE = ['Région', 'Sous-Catégorie']
+
+DEFAULT_TOP_K = 10
+
+
+# Positions des k plus grandes valeurs, de la plus grande à la plus petite : sélection partielle
+# (argpartition, linéaire) puis tri des seules k valeurs retenues
+def top_k(values, k):
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(values):
+        positions = np.argpartition(-values, k - 1)[:k]
+    else:
+        positions = np.arange(len(values))
+    return positions[np.argsort(-values[positions], kind='stable')]
+
+
+# Classement des entités à partir de lignes (codes d'entité, sommes par mesure) : les sommes sont
+# cumulées par entité puis seules les k premières sont triées et renvoyées
+def rank(column, codes, labels, sums, measure, k):
+    valid = codes >= 0
+    codes = codes[valid]
+    present = np.flatnonzero(np.bincount(codes, minlength=len(labels)))
+    totals = {m: np.bincount(codes, weights=values[valid], minlength=len(labels))[present]
+              for m, values in sums.items()}
+    best = top_k(totals[measure], k)
+    table = pd.DataFrame({column: np.asarray(labels, dtype=object)[present[best]]})
+    for m, values in totals.items():
+        table[m] = values[best]
+    return table
+
+
+# Sommes des mesures par (région, sous-catégorie, entité), construites une fois par colonne
+class RankingIndex:
+    def __init__(self, frame, column):
+        self.column = column
+        grouping = Grouping(frame, RANKING_SCOPE + [column])
+        self.groups = grouping.key_frame()
+        self.sums = {measure: grouping.sum(measure) for measure in RANKING_MEASURES}
+        self.codes, self.labels, _ = column_codes(self.groups[column])
+
+    # k premières entités d'un périmètre ; filters ne porte que sur les colonnes de RANKING_SCOPE
+    def top(self, measure, k, region='Toutes', filters=None):
+        mask = np.ones(len(self.groups), dtype=bool)
+        if region != 'Toutes':
+            mask &= (self.groups['Région'] == region).to_numpy()
+        for column, values in (filters or {}).items():
+            if values:
+                mask &= self.groups[column].isin(values).to_numpy()
+        sums = {m: values[mask] for m, values in self.sums.items()}
+        return rank(self.column, self.codes[mask], self.labels, sums, measure, k)
+
+
+# Classement calculé depuis des commandes déjà sélectionnées (filtres hors périmètre, période)
+def rank_orders(orders, column, measure, k):
+    codes, labels, _ = column_codes(orders[column])
+    sums = {m: orders[m].to_numpy(dtype=np.float64) for m in RANKING_MEASURES}
+    return rank(column, np.asarray(codes), labels, sums, measure, k)
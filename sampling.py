@@ -0,0 +1,61 @@
+import numpy as np
+
+from aggregation import column_codes
+from cube import CUBE_DIMENSIONS, CUBE_MEASURES
+from delivery import DELIVERY_COLUMN
+
+# Strates de l'échantillon : chaque combinaison région / segment / mois est représentée
+SAMPLE_STRATA = ['Région', 'Segment', 'Année', 'Mois']
+DEFAULT_SAMPLE_ROWS = 50_000
+
+# Lignes tirées au minimum par strate (ou toute la strate), pour pouvoir estimer sa variance
+MIN_PER_STRATUM = 2
+
+# Quantile de la loi normale pour un intervalle de confiance à 95 %
+Z_95 = 1.96
+
+SAMPLE_COLUMNS = CUBE_DIMENSIONS + ['Date Commande', DELIVERY_COLUMN] + CUBE_MEASURES[:-1]
+
+
+# Échantillon stratifié à allocation proportionnelle : chaque ligne porte sa strate et son poids
+# (taille de la strate / lignes tirées), pour les estimateurs de Horvitz-Thompson
+def stratified_sample(frame, size=DEFAULT_SAMPLE_ROWS, strata=SAMPLE_STRATA, seed=0):
+    codes = [column_codes(frame[column])[0] for column in strata]
+    sizes = tuple(max(int(c.max()) + 1, 1) if len(c) else 1 for c in codes)
+    valid = np.logical_and.reduce([c >= 0 for c in codes])
+    positions = np.flatnonzero(valid)
+    ids = np.ravel_multi_index([c[valid] for c in codes], sizes)
+    _, strata_ids, population = np.unique(ids, return_inverse=True, return_counts=True)
+
+    take = np.round(population * (size / max(len(ids), 1))).astype(np.int64)
+    take = np.minimum(population, np.maximum(take, MIN_PER_STRATUM))
+
+    # Tirage sans remise : ordre aléatoire à l'intérieur de chaque strate, on garde les premiers
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((rng.random(len(ids)), strata_ids))
+    starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+    rank = np.arange(len(ids)) - starts[strata_ids[order]]
+    chosen = np.sort(order[rank < take[strata_ids[order]]])
+
+    sample = frame.iloc[positions[chosen]][SAMPLE_COLUMNS].reset_index(drop=True)
+    sample['Strate'] = strata_ids[chosen].astype(np.int32)
+    sample['Poids'] = (population / take)[strata_ids[chosen]]
+    return sample
+
+
+# Demi-largeur de l'intervalle de confiance à 95 % du total estimé d'une mesure sur un domaine
+# (lignes de l'échantillon retenues par `mask`) : variance de l'estimateur stratifié, avec
+# correction de population finie
+def total_margin(sample, mask, measure):
+    strata = sample['Strate'].to_numpy()
+    weights = sample['Poids'].to_numpy()
+    values = np.where(mask, sample[measure].to_numpy(dtype=np.float64), 0.0)
+
+    drawn = np.bincount(strata).astype(np.float64)
+    population = np.bincount(strata, weights=weights)
+    total = np.bincount(strata, weights=values)
+    squares = np.bincount(strata, weights=values * values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = np.where(drawn > 1, (squares - total * total / drawn) / (drawn - 1), 0.0)
+        terms = np.where(drawn > 0, population ** 2 * (1 - drawn / population) * variance / drawn, 0.0)
+    return Z_95 * float(np.sqrt(max(terms.sum(), 0.0)))
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from delivery import DELIVERY_COLUMN, delivery_days
+
+# À incrémenter quand la forme du jeu normalisé change (invalide le cache colonnaire)
+SCHEMA_VERSION = 2
+
+# Colonnes de l'export Superstore (anglais) -> colonnes du tableau de bord (français)
+ENGLISH_COLUMNS = {
+    'Order ID': 'ID Commande',
+    'Order Date': 'Date Commande',
+    'Ship Date': 'Date Expédition',
+    'Ship Mode': 'Mode Expédition',
+    'Customer ID': 'ID Client',
+    'Customer Name': 'Client',
+    'Segment': 'Segment',
+    'Country': 'Pays',
+    'City': 'Ville',
+    'State': 'État',
+    'Region': 'Région',
+    'Product ID': 'ID Produit',
+    'Category': 'Catégorie',
+    'Sub-Category': 'Sous-Catégorie',
+    'Product Name': 'Produit',
+    'Sales': 'Ventes',
+    'Quantity': 'Quantité',
+    'Profit': 'Profit',
+    'Returns': 'Retours',
+    'Payment Mode': 'Mode Paiement',
+    'AvgDelivery': 'Livraison Moyenne',
+    'Year': 'Année',
+    'Month': 'Mois',
+    'Month-Year': 'Mois-Année',
+}
+
+# Colonnes texte à faible cardinalité, stockées en Categorical
+CATEGORICAL_COLUMNS = [
+    'Région', 'Segment', 'Mode Expédition', 'Mode Paiement', 'Catégorie', 'Sous-Catégorie',
+    'Pays', 'État', 'Ville',
+]
+
+# Types compacts des colonnes numériques
+NUMERIC_DTYPES = {
+    'Ventes': 'float32',
+    'Profit': 'float32',
+    'Quantité': 'int16',
+    'Livraison Moyenne': 'int16',
+    'Retours': 'int8',
+}
+
+FRENCH_MONTHS = {
+    'janvier': '01', 'février': '02', 'mars': '03', 'avril': '04', 'mai': '05', 'juin': '06',
+    'juillet': '07', 'août': '08', 'septembre': '09', 'octobre': '10', 'novembre': '11',
+    'décembre': '12',
+}
+
+
+# Clé de mois entière compacte : 2019-01 -> 201901
+def month_key(dates):
+    return (dates.dt.year * 100 + dates.dt.month).astype('int32')
+
+
+# Conversion des dates, y compris le format long français de l'export ("mardi 15 janvier 2019")
+# Les valeurs distinctes sont converties une seule fois puis redistribuées
+def parse_dates(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ns]')
+
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip().str.lower()
+    french = text.str.replace(r'^[^\d\s]+\s+', '', regex=True)
+    for name, number in FRENCH_MONTHS.items():
+        french = french.str.replace(f' {name} ', f' {number} ', regex=False)
+    parsed = pd.to_datetime(french, format='%d %m %Y', errors='coerce')
+    missing = parsed.isna().to_numpy()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(pd.Series(uniques[missing], dtype=object), errors='coerce').to_numpy()
+
+    result = parsed.to_numpy(dtype='datetime64[ns]')[codes]
+    result[codes < 0] = np.datetime64('NaT')
+    return pd.Series(result, index=values.index)
+
+
+# Conversion d'une colonne texte en Categorical
+def to_categorical(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    return values.astype('category')
+
+
+# Ramène un export (anglais ou déjà français) au schéma compact du tableau de bord
+def normalize(df):
+    df = df.rename(columns=ENGLISH_COLUMNS)
+    known = list(dict.fromkeys(ENGLISH_COLUMNS.values()))
+    df = df[[col for col in known if col in df.columns]].copy()
+
+    df['Date Commande'] = parse_dates(df['Date Commande'])
+    if 'Date Expédition' in df.columns:
+        df['Date Expédition'] = parse_dates(df['Date Expédition'])
+    df['Ventes'] = pd.to_numeric(df['Ventes'], errors='coerce')
+    df['Profit'] = pd.to_numeric(df['Profit'], errors='coerce')
+    df = df.dropna(subset=['Date Commande', 'Ventes', 'Profit'])
+
+    df['Année'] = df['Date Commande'].dt.year.astype('int16')
+    df['Mois'] = df['Date Commande'].dt.month.astype('int8')
+    df['Mois-Année'] = month_key(df['Date Commande'])
+    # Délai de livraison réel (-1 sans date d'expédition)
+    if 'Date Expédition' in df.columns:
+        ship_dates = df['Date Expédition']
+    else:
+        ship_dates = np.full(len(df), np.datetime64('NaT', 'ns'))
+    df[DELIVERY_COLUMN] = delivery_days(df['Date Commande'], ship_dates)
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = to_categorical(df[col])
+    for col, dtype in NUMERIC_DTYPES.items():
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(dtype)
+
+    return df.reset_index(drop=True)
+
+
+# Concaténation de jeux normalisés : les catégories sont unifiées pour rester en Categorical
+def concat_frames(frames):
+    frames = [frame for frame in frames if len(frame)] or list(frames[:1])
+    if len(frames) == 1:
+        return frames[0]
+    frames = [frame.copy(deep=False) for frame in frames]
+    for col in frames[0].columns:
+        dtypes = [frame[col].dtype for frame in frames if col in frame.columns]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            categories = pd.Index(dtypes[0].categories)
+            for dtype in dtypes[1:]:
+                categories = categories.append(dtype.categories.difference(categories))
+            for frame in frames:
+                if col in frame.columns:
+                    frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,188 @@
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+
+from charts import TABLE_CHARTS, TIMELINE_CHARTS, build_timeline_chart, kpi_values
+from delivery import format_days, format_quantile
+from timeseries import DEFAULT_POINT_BUDGET, GRANULARITIES, downsample
+
+# À incrémenter quand le contenu des instantanés change de forme (ou de calcul)
+SNAPSHOT_FORMAT = 4
+DEFAULT_SNAPSHOT_DIR = 'snapshots'
+
+# Graphiques de la page HTML statique (vue mensuelle, dans l'ordre du tableau de bord)
+HTML_CHARTS = ['region_pie', 'segment_pie', 'payment_pie', 'monthly_sales_chart', 'ship_mode_bar',
+               'monthly_profit_chart', 'subcat_bar', 'delivery_histogram']
+
+
+# Fichier d'instantané d'une valeur du filtre région (nom encodé pour rester un nom de fichier sûr)
+def snapshot_path(directory, region, extension='json'):
+    return os.path.join(directory, f"{quote(region, safe='')}.{extension}")
+
+
+# Vue pré-calculée d'une région : figures et métriques, valables pour une version du jeu
+class Snapshot:
+    def __init__(self, payload):
+        self.version = payload['version']
+        self.region = payload['region']
+        self.point_budget = payload['point_budget']
+        self._values = payload['values']
+        self._figures = payload['figures']
+
+    # Figure (ou tuple de métriques pour 'kpis') d'un identifiant de graphique, None si absent
+    # Les métriques indéfinies (NaN, délais d'une source sans dates d'expédition) sont écrites null
+    def get(self, chart_id):
+        if chart_id in self._values:
+            return tuple(float('nan') if value is None else value for value in self._values[chart_id])
+        if chart_id in self._figures:
+            return go.Figure(self._figures[chart_id])
+        return None
+
+
+# Instantané d'une région s'il correspond à la version du jeu et au budget de points, sinon None
+def load_snapshot(directory, region, version, point_budget=DEFAULT_POINT_BUDGET):
+    path = snapshot_path(directory, region)
+    try:
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (payload.get('format') != SNAPSHOT_FORMAT or payload.get('version') != version
+            or payload.get('region') != region or payload.get('point_budget') != point_budget):
+        return None
+    return Snapshot(payload)
+
+
+# Figures et métriques d'une vue, avec les mêmes constructeurs que l'application
+def build_view(tables, series, point_budget):
+    figures = {chart_id: build(tables[name]) for chart_id, (name, build) in TABLE_CHARTS.items()}
+    for granularity, frame in series.items():
+        for chart_id, (measure, color) in TIMELINE_CHARTS.items():
+            figures[f'{chart_id}:{granularity}'] = build_timeline_chart(
+                downsample(frame, measure, point_budget), measure, color)
+    kpis = list(kpi_values(tables.__getitem__))
+    return figures, kpis
+
+
+# Page HTML autonome de la vue mensuelle (plotly.js chargé une fois depuis le CDN)
+def render_html(region, version, figures, kpis):
+    total_sales, total_profit, total_quantity, avg_delivery, p50, p90, p99 = kpis
+    cards = [('Profit', f'{total_profit/1000:.0f}K'), ('Ventes', f'{total_sales/1000000:.1f}M'),
+             ('Quantité', f'{total_quantity/1000:.0f}K'), ('Livraison Moyenne', format_days(avg_delivery)),
+             ('Délai médian', format_quantile(p50)), ('Délai p90', format_quantile(p90)),
+             ('Délai p99', format_quantile(p99))]
+    parts = [
+        '<!DOCTYPE html>',
+        '<html lang="fr"><head><meta charset="utf-8">',
+        f'<title>Tableau de Bord des Ventes Super Store - {html.escape(region)}</title></head>',
+        '<body style="background-color: #1a1d29; color: #ffffff; font-family: Arial, sans-serif;">',
+        '<h1 style="color: #74b9ff; text-align: center;">Tableau de Bord des Ventes Super Store</h1>',
+        f'<p style="text-align: center;">Région : {html.escape(region)} &middot; version {html.escape(version)}</p>',
+        '<div style="display: flex; justify-content: space-around;">',
+    ]
+    for label, value in cards:
+        parts.append(f'<div style="text-align: center;"><div>{label}</div>'
+                     f'<div style="font-size: 3rem; font-weight: bold; color: #74b9ff;">{value}</div></div>')
+    parts.append('</div>')
+    for i, chart_id in enumerate(HTML_CHARTS):
+        parts.append(pio.to_html(figures[chart_id], full_html=False, include_plotlyjs='cdn' if i == 0 else False,
+                                 config={'displayModeBar': False}))
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+# Tâche d'un processus : figures d'une région, sérialisées en JSON et en HTML
+def render_view(version, region, tables, series, point_budget):
+    figures, kpis = build_view(tables, series, point_budget)
+    payload = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'region': region,
+        'point_budget': point_budget,
+        'created': time.time(),
+        'values': {'kpis': kpis},
+        'figures': {chart_id: fig.to_plotly_json() for chart_id, fig in figures.items()},
+    }
+    return to_json_plotly(payload), render_html(region, version, figures, kpis)
+
+
+# Écriture atomique : les sessions ne lisent jamais un instantané partiel
+def write_text(path, text):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Instantanés de toutes les valeurs du filtre région ('Toutes' comprise)
+# Les tables et séries sont calculées ici (lecture du cube) ; la construction et la sérialisation
+# des figures, qui dominent le coût, sont réparties entre `workers` processus
+def render_all(backend, directory, workers=1, point_budget=DEFAULT_POINT_BUDGET):
+    version = backend.version
+    regions = ['Toutes'] + backend.values('Région')
+    tasks = []
+    for region in regions:
+        series = {g: backend.series(region, g) for g in GRANULARITIES if g != 'Mois'}
+        tasks.append((version, region, backend.tables(region), series, point_budget))
+
+    os.makedirs(directory, exist_ok=True)
+    if workers > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as pool:
+            results = list(pool.map(render_view, *zip(*tasks)))
+    else:
+        results = [render_view(*task) for task in tasks]
+
+    paths = []
+    for region, (payload, page) in zip(regions, results):
+        write_text(snapshot_path(directory, region, 'html'), page)
+        write_text(snapshot_path(directory, region), payload)
+        paths.append(snapshot_path(directory, region))
+    return paths
+
+
+def main():
+    from backends import DuckDBBackend, PandasBackend
+    from ingest import DatasetStore
+    from sources import load_dataset
+
+    parser = argparse.ArgumentParser(description="Instantanés HTML/JSON du tableau de bord pour chaque région")
+    parser.add_argument('--source', default=os.environ.get('DASHBOARD_SOURCE', 'synthetic'),
+                        choices=['synthetic', 'real'])
+    parser.add_argument('--backend', default=os.environ.get('DASHBOARD_BACKEND', 'pandas'),
+                        choices=['pandas', 'duckdb'])
+    parser.add_argument('--parquet', default=os.environ.get('DASHBOARD_PARQUET', 'commandes.parquet'))
+    parser.add_argument('--output', default=os.environ.get('DASHBOARD_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--point-budget', type=int,
+                        default=int(os.environ.get('DASHBOARD_POINT_BUDGET', DEFAULT_POINT_BUDGET)))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.backend == 'duckdb':
+        backend = DuckDBBackend(args.parquet)
+    else:
+        store = DatasetStore(load_dataset(args.source), os.environ.get('DASHBOARD_DELTA_DIR', 'deltas'))
+        backend = PandasBackend(store.refresh())
+    paths = render_all(backend, args.output, args.workers, args.point_budget)
+    print(f'{len(paths)} instantanés ({backend.version}) en {time.perf_counter() - start:.1f} s', file=sys.stderr)
+    for path in paths:
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
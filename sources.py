@@ -0,0 +1,83 @@
+import logging
+import os
+
+from cache import CACHE_FORMAT, cached_frame, shared_frame
+from dataset import Dataset, sort_dataset
+from ingest import DatasetStore, read_excel_compact
+from schema import SCHEMA_VERSION
+from synthetic import DEFAULT_END, DEFAULT_RECORDS, DEFAULT_SEED, DEFAULT_START, generate_orders
+
+logger = logging.getLogger('tableau_de_bord.sources')
+
+# Fichier des vraies données (DASHBOARD_SOURCE=real)
+REAL_SOURCE = 'DONNEESS.xlsx'
+
+# Mode données partagées : fichier Arrow commun aux processus serveur (DASHBOARD_SHARED_DATA)
+SHARED_DATA = os.environ.get('DASHBOARD_SHARED_DATA')
+
+
+# Lecture en flux du fichier Excel, ramené bloc par bloc au schéma du tableau de bord
+def parse_real_data(path):
+    return read_excel_compact(path)
+
+# Fonction pour charger les données depuis le fichier Excel (via le cache colonnaire)
+# Un fichier absent ou illisible lève une exception : rien n'est mis en cache sous la version réelle
+def load_real_data():
+    return cached_frame(REAL_SOURCE, parse_real_data, tag=f'schema-{SCHEMA_VERSION}')
+
+# Fonction pour charger les données simulées
+def load_data(n_records=DEFAULT_RECORDS, seed=DEFAULT_SEED, start=DEFAULT_START, end=DEFAULT_END):
+    return generate_orders(n_records, seed=seed, start=start, end=end)
+
+
+# Version du jeu réel : suit la date de modification et la taille du fichier, pour qu'un instantané
+# ou une figure calculés sur un ancien fichier ne soient jamais servis
+def real_version():
+    try:
+        stat = os.stat(REAL_SOURCE)
+    except OSError:
+        return 'real'
+    return f'real-{stat.st_mtime_ns}-{stat.st_size}'
+
+
+# Version du jeu d'une source, connue sans le charger
+def dataset_version(source):
+    if source == 'real':
+        return real_version()
+    return f"synthetic-{int(os.environ.get('DASHBOARD_ROWS', DEFAULT_RECORDS))}"
+
+
+# Jeu de données d'une source ('real' ou 'synthetic'), tel que le sert le tableau de bord
+# En mode partagé, les commandes sont lues sans copie depuis le fichier Arrow commun ; elles y sont
+# écrites déjà triées (région, date) pour que Dataset n'ait pas à les recopier
+def load_dataset(source, shared_path=SHARED_DATA):
+    version = dataset_version(source)
+    if source == 'real':
+        load = load_real_data
+    else:
+        rows = int(os.environ.get('DASHBOARD_ROWS', DEFAULT_RECORDS))
+        load = lambda: load_data(rows)
+    if shared_path:
+        key = {'version': version, 'format': CACHE_FORMAT}
+        frame = shared_frame(shared_path, key, lambda: sort_dataset(load()))
+    else:
+        frame = load()
+    return Dataset(frame, version=version)
+
+
+# Jeu d'une source et lots de nouvelles commandes ; avec watch_interval > 0 (secondes), la source
+# et les lots sont surveillés en arrière-plan et les nouvelles versions publiées sans attente
+# Au démarrage seulement, un fichier réel illisible laisse place au jeu simulé, sous sa propre
+# version : la surveillance publie le jeu réel dès que le fichier redevient lisible
+def open_store(source, delta_dir=None, watch_interval=0):
+    try:
+        dataset = load_dataset(source)
+    except Exception:
+        if source != 'real':
+            raise
+        logger.exception("Lecture de %s impossible : données simulées servies", REAL_SOURCE)
+        dataset = load_dataset('synthetic')
+    store = DatasetStore(dataset, delta_dir)
+    if watch_interval > 0:
+        store.watch(lambda: dataset_version(source), lambda: load_dataset(source), watch_interval)
+    return store
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from delivery import DELIVERY_COLUMN, delivery_days
+from schema import month_key
+
+# Valeurs possibles des colonnes catégorielles des données simulées
+REGIONS = ['Est', 'Ouest', 'Centre', 'Sud']
+SEGMENTS = ['Consommateur', 'Entreprise', 'Bureau à domicile']
+SHIP_MODES = ['Classe Standard', 'Deuxième Classe', 'Première Classe', 'Même Jour']
+PAYMENT_MODES = ['Cartes', 'En ligne', 'Contre-remboursement']
+CATEGORIES = ['Fournitures de Bureau', 'Mobilier', 'Technologie']
+SUB_CATEGORIES = ['Classeurs', 'Chaises', 'Téléphones']
+
+# Catalogue et clientèle : chaque produit appartient à une sous-catégorie ; les tirages favorisent
+# les premiers numéros pour que les classements aient des têtes marquées
+PRODUCTS_PER_SUBCATEGORY = 500
+PRODUCTS = [f'{sub_category} {number:03d}' for sub_category in SUB_CATEGORIES
+            for number in range(1, PRODUCTS_PER_SUBCATEGORY + 1)]
+CUSTOMERS = [f'Client {number:04d}' for number in range(1, 2001)]
+
+DEFAULT_RECORDS = 5901
+DEFAULT_SEED = 42
+DEFAULT_START = '2019-01-01'
+DEFAULT_END = '2021-12-31'
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+# Colonne Categorical tirée directement sous forme de codes
+def _draw_categorical(rng, values, size):
+    codes = rng.integers(0, len(values), size=size, dtype=np.int8)
+    return pd.Categorical.from_codes(codes, categories=values)
+
+
+# Rang tiré avec une loi décroissante (densité en 1/sqrt) : quelques valeurs très fréquentes
+def _draw_skewed(rng, n_values, size):
+    return (rng.random(size) ** 2 * n_values).astype(np.int16)
+
+
+# Tirage vectorisé d'un bloc de commandes : chaque colonne est générée d'un seul coup,
+# directement au schéma compact du tableau de bord (voir schema.normalize)
+def _generate_chunk(rng, offset, size, start, n_days):
+    order_days = start + rng.integers(0, n_days, size=size).astype('timedelta64[D]')
+    ship_days = order_days + rng.integers(1, 15, size=size).astype('timedelta64[D]')
+    order_dates = pd.DatetimeIndex(order_days.astype('datetime64[ns]'))
+    years = order_dates.year
+
+    ids = np.arange(100000 + offset, 100000 + offset + size)
+    order_ids = 'FR-' + pd.Index(years).astype(str) + '-' + pd.Index(ids).astype(str)
+
+    df = pd.DataFrame({
+        'ID Commande': np.asarray(order_ids, dtype=object),
+        'Date Commande': order_dates,
+        'Date Expédition': pd.DatetimeIndex(ship_days.astype('datetime64[ns]')),
+        'Mode Expédition': _draw_categorical(rng, SHIP_MODES, size),
+        'Région': _draw_categorical(rng, REGIONS, size),
+        'Segment': _draw_categorical(rng, SEGMENTS, size),
+        'Catégorie': _draw_categorical(rng, CATEGORIES, size),
+        'Sous-Catégorie': _draw_categorical(rng, SUB_CATEGORIES, size),
+        'Ventes': rng.uniform(10, 500, size=size).astype(np.float32),
+        'Quantité': rng.integers(1, 10, size=size, dtype=np.int16),
+        'Profit': rng.uniform(-50, 200, size=size).astype(np.float32),
+        'Mode Paiement': _draw_categorical(rng, PAYMENT_MODES, size),
+        'Livraison Moyenne': rng.integers(1, 14, size=size, dtype=np.int16),
+    })
+    df['Année'] = df['Date Commande'].dt.year.astype('int16')
+    df['Mois'] = df['Date Commande'].dt.month.astype('int8')
+    df['Mois-Année'] = month_key(df['Date Commande'])
+    df[DELIVERY_COLUMN] = delivery_days(order_days, ship_days)
+    # Tirés après les autres colonnes : les valeurs déjà générées ne changent pas
+    products = (df['Sous-Catégorie'].cat.codes.to_numpy().astype(np.int16) * PRODUCTS_PER_SUBCATEGORY
+                + _draw_skewed(rng, PRODUCTS_PER_SUBCATEGORY, size))
+    df['Produit'] = pd.Categorical.from_codes(products, categories=PRODUCTS)
+    df['Client'] = pd.Categorical.from_codes(_draw_skewed(rng, len(CUSTOMERS), size), categories=CUSTOMERS)
+    df.index = pd.RangeIndex(offset, offset + size)
+    return df
+
+
+# Générateur par blocs pour les volumes qui ne tiennent pas en mémoire
+# Chaque bloc a son propre flux aléatoire : le résultat ne dépend que de la graine et de chunk_size
+def iter_orders(n_records=DEFAULT_RECORDS, seed=DEFAULT_SEED, start=DEFAULT_START,
+                end=DEFAULT_END, chunk_size=DEFAULT_CHUNK_SIZE):
+    start = np.datetime64(pd.Timestamp(start).date(), 'D')
+    n_days = int((np.datetime64(pd.Timestamp(end).date(), 'D') - start).astype(int)) + 1
+    if n_days <= 0:
+        raise ValueError("La date de fin doit être postérieure à la date de début")
+    if n_records < 1:
+        raise ValueError(f"Le nombre de commandes doit être au moins 1 (reçu : {n_records})")
+
+    n_chunks = max(1, -(-n_records // chunk_size))
+    streams = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, stream in enumerate(streams):
+        offset = i * chunk_size
+        size = min(chunk_size, n_records - offset)
+        if size <= 0:
+            break
+        yield _generate_chunk(np.random.default_rng(stream), offset, size, start, n_days)
+
+
+# Jeu de données simulé complet en mémoire
+def generate_orders(n_records=DEFAULT_RECORDS, seed=DEFAULT_SEED, start=DEFAULT_START,
+                    end=DEFAULT_END, chunk_size=DEFAULT_CHUNK_SIZE):
+    chunks = list(iter_orders(n_records, seed, start, end, chunk_size))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks)
+
+
+# Écriture en flux d'un jeu simulé au format Parquet, bloc par bloc, sans tout garder en mémoire
+# Chaque bloc est trié par région pour que les groupes de lignes Parquet puissent être écartés
+# par les filtres (statistiques min/max) des moteurs de requête
+def write_parquet(path, n_records=DEFAULT_RECORDS, seed=DEFAULT_SEED, start=DEFAULT_START,
+                  end=DEFAULT_END, chunk_size=DEFAULT_CHUNK_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from partition import sort_by
+
+    writer = None
+    try:
+        for chunk in iter_orders(n_records, seed, start, end, chunk_size):
+            table = pa.Table.from_pandas(sort_by(chunk, 'Région'), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=max(chunk_size // 16, 1))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Génère un jeu de commandes simulées au format Parquet")
+    parser.add_argument('path', help="fichier Parquet de sortie")
+    parser.add_argument('--rows', type=int, default=DEFAULT_RECORDS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--start', default=DEFAULT_START)
+    parser.add_argument('--end', default=DEFAULT_END)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    write_parquet(args.path, args.rows, args.seed, args.start, args.end, args.chunk_size)
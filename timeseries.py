@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import Grouping
+from schema import concat_frames
+
+# Granularités proposées pour les courbes de ventes et de profit
+GRANULARITIES = ['Mois', 'Semaine', 'Jour']
+
+# Nombre maximal de points envoyés au navigateur par courbe (de l'ordre de la largeur en pixels)
+DEFAULT_POINT_BUDGET = 1200
+
+SERIES_MEASURES = ['Ventes', 'Profit']
+
+
+# Agrégat journalier par région, construit une fois au chargement : les vues jour et semaine
+# n'ont ensuite jamais besoin des commandes détaillées
+def build_daily(frame):
+    days = frame['Date Commande'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    keys = pd.DataFrame({'Région': frame['Région'].to_numpy(), 'Jour': days})
+    for measure in SERIES_MEASURES:
+        keys[measure] = frame[measure].to_numpy()
+    return _rollup_days(keys)
+
+
+def _rollup_days(frame):
+    grouping = Grouping(frame, ['Région', 'Jour'])
+    daily = grouping.key_frame()
+    for measure in SERIES_MEASURES:
+        daily[measure] = grouping.sum(measure)
+    return daily
+
+
+# Fusion d'agrégats journaliers (agrégat existant + lot de nouvelles commandes)
+def merge_daily(dailies):
+    return _rollup_days(concat_frames(dailies))
+
+
+# Série temporelle (toutes régions confondues) au pas du jour ou de la semaine (semaines du lundi)
+def resample(daily, granularity):
+    days = daily['Jour'].to_numpy()
+    if granularity == 'Semaine':
+        # Le 1970-01-01 est un jeudi : on décale de 3 jours pour caler les semaines sur le lundi
+        days = (days + 3) // 7 * 7 - 3
+    elif granularity != 'Jour':
+        raise ValueError(f"Granularité inconnue : {granularity}")
+    frame = pd.DataFrame({'Jour': days})
+    for measure in SERIES_MEASURES:
+        frame[measure] = daily[measure].to_numpy()
+    grouping = Grouping(frame, ['Jour'])
+    series = pd.DataFrame({'Date': grouping.key_frame()['Jour'].to_numpy().astype('datetime64[D]')})
+    for measure in SERIES_MEASURES:
+        series[measure] = grouping.sum(measure)
+    return series
+
+
+# Sous-échantillonnage LTTB (Largest-Triangle-Three-Buckets) : garde la forme visuelle de la
+# courbe avec au plus `threshold` points ; renvoie les positions des points conservés
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+# Série réduite au budget de points : positions LTTB calculées sur la mesure affichée
+def downsample(series, measure, point_budget=DEFAULT_POINT_BUDGET):
+    if len(series) <= point_budget:
+        return series
+    x = series['Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return series.iloc[lttb(x, series[measure].to_numpy(), point_budget)]